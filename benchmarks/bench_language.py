@@ -0,0 +1,81 @@
+"""Benchmark the caption language detector against the old regex version.
+
+Usage: python benchmarks/bench_language.py [filenames.txt ...]
+
+Each corpus file holds one filename per line (for example the names exported
+from a source channel). Without arguments a synthetic corpus is generated.
+"""
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.language import detect_language, extract_language_and_subtitle
+
+LEGACY_PATTERNS = [
+    (r'\[?english\]?|\[?eng\]?|esub', ('English', 'Esub')),
+    (r'\[?hindi\]?|\[?hin\]?|hsub', ('Hindi', 'Hsub')),
+    (r'\[?telugu\]?|\[?tel\]?|tesub', ('Telugu', 'Tesub')),
+    (r'\[?kannada\]?|\[?kan\]?|ksub', ('Kannada', 'Ksub')),
+    (r'\[?tamil\]?|\[?tam\]?|tsub', ('Tamil', 'Tsub')),
+    (r'\[?malayalam\]?|\[?mal\]?|msub', ('Malayalam', 'Msub')),
+    (r'\[?punjabi\]?|\[?pan\]?|psub', ('Punjabi', 'Psub')),
+]
+
+def legacy_extract(file_name):
+    """The per-pattern re.search version this detector replaced"""
+    if not file_name:
+        return "Unknown", ""
+    file_lower = file_name.lower()
+    for pattern, (lang, sub_abbr) in LEGACY_PATTERNS:
+        if re.search(pattern, file_lower):
+            subtitle = sub_abbr if re.search(r'esub|hsub|tesub|ksub|tsub|msub|psub|sub', file_lower) else ""
+            return lang, subtitle
+    return "Unknown", ""
+
+def synthetic_corpus(size=200000, unique=40000):
+    rng = random.Random(42)
+    titles = ["Leo", "Jailer", "Vikram", "Kantara", "Pushpa", "Animal", "Salaar", "Premalu", "Jawan", "Dunki"]
+    langs = ["Tamil", "Telugu", "Hindi", "Malayalam", "Kannada", "Eng", "Tam+Tel+Hin", "Punjabi", ""]
+    extras = ["", "ESub", "HDRip", "x264", "HEVC", "AAC", "DD5.1", "MSubs", "WEB-DL"]
+    names = []
+    for i in range(unique):
+        parts = [rng.choice(titles), str(rng.randint(1990, 2025)), rng.choice(langs),
+                 rng.choice(["480p", "720p", "1080p", "2160p"]), rng.choice(extras), rng.choice(extras)]
+        names.append(f"www.1TamilMV.world - {'.'.join(p for p in parts if p)}.S01E{i % 30:02d}.mkv")
+    # Real ranges repeat names (re-uploads, mirrors), so sample with repetition
+    return [rng.choice(names) for _ in range(size)]
+
+def load_corpus(paths):
+    names = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            names.extend(line.strip() for line in f if line.strip())
+    return names
+
+def timed(label, func, names):
+    started = time.perf_counter()
+    results = [func(name) for name in names]
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed * 1000:9.1f} ms  {elapsed / len(names) * 1e6:6.2f} us/name")
+    return results
+
+def main():
+    names = load_corpus(sys.argv[1:]) if len(sys.argv) > 1 else synthetic_corpus()
+    print(f"{len(names)} names, {len(set(names))} unique\n")
+
+    legacy = timed("legacy regex", legacy_extract, names)
+    detect_language.cache_clear()
+    timed("tokenised (cold)", lambda n: detect_language.__wrapped__(n) if n else ("Unknown", ""), names)
+    detect_language.cache_clear()
+    current = timed("tokenised + memo", extract_language_and_subtitle, names)
+    timed("tokenised (warm)", extract_language_and_subtitle, names)
+
+    changed = sum(1 for old, new in zip(legacy, current) if old != new)
+    print(f"\n{changed} names ({changed / len(names):.1%}) detected differently from the legacy regex")
+
+if __name__ == "__main__":
+    main()
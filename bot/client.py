@@ -1,20 +1,148 @@
+from contextlib import asynccontextmanager
 from pyrogram.client import Client
 from bot.config import Config
+from bot.ratelimit import RateLimiter
 
-app = Client(
+class RateLimitedClient(Client):
+    """Client whose API calls all go through its own rate limiter (limits are per account)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = RateLimiter(Config.API_RATE_LIMIT, Config.CHAT_RATE_LIMIT, Config.FLOOD_WAIT_MAX)
+    
+    async def invoke(self, query, *args, **kwargs):
+        # FloodWaits come back to the limiter instead of being slept through per call
+        # (get_messages passes -1, "always sleep", which would bypass it)
+        if kwargs.get("sleep_threshold") is None or kwargs["sleep_threshold"] < 0:
+            kwargs["sleep_threshold"] = 0
+        return await self.limiter.call(query, lambda: super(RateLimitedClient, self).invoke(query, *args, **kwargs))
+
+app = RateLimitedClient(
     "bot_session",
     api_id=Config.API_ID,
     api_hash=Config.API_HASH,
     bot_token=Config.BOT_TOKEN,
-    workdir="."
+    workdir=".",
+    max_concurrent_transmissions=Config.MAX_CONCURRENT_TRANSMISSIONS
 )
 
 user_client = None
 if Config.SESSION_STRING:
-    user_client = Client(
+    user_client = RateLimitedClient(
         "user_session",
         api_id=Config.API_ID,
         api_hash=Config.API_HASH,
         session_string=Config.SESSION_STRING,
-        workdir="."
+        workdir=".",
+        max_concurrent_transmissions=Config.MAX_CONCURRENT_TRANSMISSIONS,
+        no_updates=True
     )
+
+# Extra bots only move files; commands are still handled by app
+helper_clients = [
+    RateLimitedClient(
+        f"helper_bot_{i}",
+        api_id=Config.API_ID,
+        api_hash=Config.API_HASH,
+        bot_token=token,
+        workdir=".",
+        max_concurrent_transmissions=Config.MAX_CONCURRENT_TRANSMISSIONS,
+        no_updates=True
+    )
+    for i, token in enumerate(Config.EXTRA_BOT_TOKENS, 1)
+]
+
+class ClientPool:
+    """Sessions that can carry transfers, picked by load and capability"""
+    
+    def __init__(self, primary: Client, others: list):
+        self.primary = primary
+        self.others = others
+        self.started = []   # Extra sessions that connected
+        self.premium = set()  # Sessions allowed to send files over 2 GB
+        self.users = set()  # User (non-bot) sessions, which resolve chats from their peer cache
+        self.ready = [primary]  # Sessions that can see the current job's chats
+        self.active = {}  # Transfers running per session
+    
+    async def start(self):
+        """Connect the extra sessions (the primary is started by main)"""
+        for client in self.others:
+            try:
+                await client.start()
+                me = await client.get_me()
+                if not me.is_bot:
+                    self.users.add(client)
+                    await self.warm_peers(client)
+                self.started.append(client)
+                if me.is_premium:
+                    self.premium.add(client)
+                print(f"✅ Session ready: {me.first_name}{' (premium)' if me.is_premium else ''}")
+            except Exception as e:
+                print(f"⚠️ Session {client.name} not started: {e}")
+        self.ready = [self.primary] + self.started
+    
+    async def warm_peers(self, client: Client):
+        """Fill a user session's peer cache from its dialogs.
+        Session-string logins start with an empty in-memory cache, and users (unlike bots)
+        cannot resolve a -100 channel id without a stored access hash."""
+        count = 0
+        try:
+            async for _ in client.get_dialogs():
+                count += 1
+        except Exception as e:
+            print(f"⚠️ {client.name}: could not load dialogs: {e}")
+        print(f"📇 {client.name}: {count} dialogs cached")
+    
+    async def stop(self):
+        for client in self.started:
+            try:
+                await client.stop()
+            except:
+                pass
+        self.started = []
+        self.ready = [self.primary]
+    
+    async def reaches(self, client: Client, chat_ids: list):
+        for chat_id in chat_ids:
+            await client.get_chat(chat_id)
+    
+    async def prepare(self, chat_ids: list):
+        """Keep only the sessions that can reach every chat of the next job"""
+        self.ready = [self.primary]
+        for client in self.started:
+            try:
+                try:
+                    await self.reaches(client, chat_ids)
+                except Exception:
+                    if client not in self.users:
+                        raise
+                    # Chats joined since startup are not cached yet
+                    await self.warm_peers(client)
+                    await self.reaches(client, chat_ids)
+                self.ready.append(client)
+            except Exception as e:
+                if client in self.premium:
+                    print(f"🚨 PREMIUM SESSION {client.name} DROPPED for this job: {e}")
+                    print("🚨 Files over 2 GB will be skipped unless the premium account has joined the source and every destination")
+                else:
+                    print(f"⚠️ {client.name} skipped for this job: {e}")
+        return len(self.ready)
+    
+    def size(self) -> int:
+        return len(self.ready)
+    
+    def has_premium(self) -> bool:
+        return any(client in self.premium for client in self.ready)
+    
+    @asynccontextmanager
+    async def lease(self, premium: bool = False):
+        """Least busy session for one transfer; files over 2 GB go to a premium session"""
+        candidates = [c for c in self.ready if c in self.premium] if premium else []
+        client = min(candidates or self.ready, key=lambda c: self.active.get(c, 0))
+        self.active[client] = self.active.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            self.active[client] -= 1
+
+client_pool = ClientPool(app, helper_clients + ([user_client] if user_client else []))
@@ -10,6 +10,7 @@ class Config:
     BOT_TOKEN = os.getenv("BOT_TOKEN", "")
     SESSION_STRING = os.getenv("SESSION_STRING", "")
     LOG_CHANNEL_ID = os.getenv("LOG_CHANNEL_ID", "")
+    EXTRA_BOT_TOKENS = [t.strip() for t in os.getenv("EXTRA_BOT_TOKENS", "").split(",") if t.strip()]  # Extra transfer bots
     OWNER_ID = int(os.getenv("OWNER_ID", "0"))
     
     # Persistent settings (loaded from storage, not env)
@@ -25,10 +26,39 @@ class Config:
     START_LINK = None
     END_LINK = None
     PROCESS_ABOVE_2GB = False  # Telegram Premium restriction
+    PARALLEL_DOWNLOADS = 1  # Files transferred at once
     
     DOWNLOAD_DIR = "downloads"
+    DISK_MARGIN_MB = int(os.getenv("DISK_MARGIN_MB", "200"))  # Space always left free when staging downloads
+    PREFETCH_MB = int(os.getenv("PREFETCH_MB", "2048"))  # Download ahead while uploading (0 disables)
+    
+    # Large files download as parallel byte ranges, each over its own media session
+    DOWNLOAD_SEGMENTS = int(os.getenv("DOWNLOAD_SEGMENTS", "4"))
+    SEGMENTED_MIN_MB = int(os.getenv("SEGMENTED_MIN_MB", "64"))
+    
+    # Big uploads send this many parts at once, spread over UPLOAD_SESSIONS media connections
+    UPLOAD_PARALLEL_PARTS = int(os.getenv("UPLOAD_PARALLEL_PARTS", "8"))
+    UPLOAD_SESSIONS = int(os.getenv("UPLOAD_SESSIONS", "2"))
     THUMBNAIL_DIR = "thumbnails"
     
+    # Range scanning (get_messages accepts at most 200 ids per call)
+    SCAN_BATCH_SIZE = 200
+    SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "4"))
+    
+    # Stream source chunks straight into the upload instead of staging files on disk
+    RELAY_MODE = os.getenv("RELAY_MODE", "false").lower() == "true"
+    
+    # Pyrogram serialises transfers beyond this many per client
+    MAX_CONCURRENT_TRANSMISSIONS = int(os.getenv("MAX_CONCURRENT_TRANSMISSIONS", "8"))
+    
+    # API call budgets per client account (FloodWaits up to FLOOD_WAIT_MAX seconds are waited out)
+    API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "25"))  # Requests per second overall
+    CHAT_RATE_LIMIT = float(os.getenv("CHAT_RATE_LIMIT", "60"))  # Posts/edits per minute per chat
+    FLOOD_WAIT_MAX = int(os.getenv("FLOOD_WAIT_MAX", "600"))
+    
+    # Extra caption languages, e.g. "Bengali:Bsub:bengali,ben,bsub;Marathi:Masub:marathi"
+    EXTRA_LANGUAGES = os.getenv("EXTRA_LANGUAGES", "")
+    
     @classmethod
     def is_configured(cls):
         return all([cls.API_ID, cls.API_HASH, cls.BOT_TOKEN, cls.OWNER_ID])
@@ -1,342 +1,557 @@
 import os
+import sys
+import json
+import time
 import asyncio
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 # PostgreSQL connection
 DATABASE_URL = os.getenv("DATABASE_URL", "")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_IDLE_CHECK = 30  # Seconds idle after which a pooled connection is pinged before use
 
-def get_db_connection():
-    """Get PostgreSQL connection"""
+# Fail fast on a dead host and notice dropped connections (managed Postgres closes idle ones)
+CONNECT_OPTIONS = {
+    "connect_timeout": 10,
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises instead of waiting when exhausted
+_pool_slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+_returned_at = {}  # id(connection) -> when it went back to the pool
+
+def get_pool():
+    """Create the shared connection pool on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # psycopg2 is only loaded once the database is actually used
+                from psycopg2.pool import ThreadedConnectionPool
+                _pool = ThreadedConnectionPool(1, DB_POOL_SIZE, DATABASE_URL, **CONNECT_OPTIONS)
+    return _pool
+
+def is_connection_error(error) -> bool:
+    """True for errors that mean the connection itself is gone"""
+    psycopg2 = sys.modules.get("psycopg2")
+    return bool(psycopg2) and isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+
+def discard_connection(pool, conn):
+    _returned_at.pop(id(conn), None)
+    try:
+        pool.putconn(conn, close=True)
+    except Exception:
+        pass
+
+def checkout(pool):
+    """A pooled connection that answers; idle ones are pinged and replaced if the server dropped them"""
+    for _ in range(DB_POOL_SIZE + 1):
+        conn = pool.getconn()
+        returned_at = _returned_at.pop(id(conn), None)
+        if conn.closed:
+            discard_connection(pool, conn)
+            continue
+        if returned_at is None or time.monotonic() - returned_at < DB_IDLE_CHECK:
+            return conn
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return conn
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            discard_connection(pool, conn)
+    return pool.getconn()
+
+@contextmanager
+def pooled_connection():
+    """Borrow a pooled connection; yields None when PostgreSQL is unavailable"""
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        pool = get_pool()
     except Exception as e:
         print(f"❌ PostgreSQL connection error: {e}")
-        return None
+        yield None
+        return
+    
+    with _pool_slots:
+        try:
+            conn = checkout(pool)
+        except Exception as e:
+            print(f"❌ PostgreSQL connection error: {e}")
+            yield None
+            return
+        
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            broken = is_connection_error(e)
+            if not conn.closed and not broken:
+                conn.rollback()
+            raise
+        finally:
+            # Drop broken connections instead of handing them out again
+            if broken or conn.closed:
+                discard_connection(pool, conn)
+            else:
+                _returned_at[id(conn)] = time.monotonic()
+                pool.putconn(conn)
+
+def with_retry(func, *args):
+    """Run func, once more on a fresh connection if the first one turned out to be dead"""
+    try:
+        return func(*args)
+    except Exception as e:
+        if not is_connection_error(e):
+            raise
+        print(f"⚠️ PostgreSQL connection lost ({e}), retrying")
+        return func(*args)
+
+async def run_db(func, *args):
+    """Run a blocking database function off the event loop"""
+    return await asyncio.to_thread(with_retry, func, *args)
 
 def init_db():
     """Initialize database tables"""
-    conn = get_db_connection()
-    if not conn:
-        print("⚠️ Cannot initialize database - no connection")
-        return False
-    
     try:
-        cursor = conn.cursor()
-        
-        # Create settings table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                _id VARCHAR(50) PRIMARY KEY,
-                source_channels TEXT,
-                destination_channels TEXT,
-                whitelist_words TEXT,
-                blacklist_words TEXT,
-                removed_words TEXT,
-                file_prefix VARCHAR(255),
-                file_suffix VARCHAR(255),
-                remove_username BOOLEAN,
-                custom_caption TEXT,
-                start_link VARCHAR(255),
-                end_link VARCHAR(255),
-                process_above_2gb BOOLEAN,
-                parallel_downloads INTEGER,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        with pooled_connection() as conn:
+            if not conn:
+                print("⚠️ Cannot initialize database - no connection")
+                return False
+            
+            with conn.cursor() as cursor:
+                # Create settings table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS settings (
+                        _id VARCHAR(50) PRIMARY KEY,
+                        source_channels TEXT,
+                        destination_channels TEXT,
+                        whitelist_words TEXT,
+                        blacklist_words TEXT,
+                        removed_words TEXT,
+                        file_prefix VARCHAR(255),
+                        file_suffix VARCHAR(255),
+                        remove_username BOOLEAN,
+                        custom_caption TEXT,
+                        start_link VARCHAR(255),
+                        end_link VARCHAR(255),
+                        process_above_2gb BOOLEAN,
+                        parallel_downloads INTEGER,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # Ledger of mirrored messages, so overlapping ranges are not redone
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS processed_files (
+                        source_chat BIGINT NOT NULL,
+                        message_id BIGINT NOT NULL,
+                        file_unique_id VARCHAR(64),
+                        file_name TEXT,
+                        dest_message_ids TEXT,
+                        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (source_chat, message_id)
+                    )
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS processed_files_unique_id_idx
+                    ON processed_files (file_unique_id)
+                """)
+                
+                # Range jobs with a resume checkpoint: every id below checkpoint_id is finished,
+                # completed_ids holds finished ids at or above it
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id SERIAL PRIMARY KEY,
+                        source_chat BIGINT NOT NULL,
+                        start_link VARCHAR(255),
+                        end_link VARCHAR(255),
+                        start_id BIGINT NOT NULL,
+                        end_id BIGINT NOT NULL,
+                        checkpoint_id BIGINT NOT NULL,
+                        completed_ids TEXT DEFAULT '[]',
+                        status VARCHAR(20) DEFAULT 'running',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
         
-        conn.commit()
         print("✅ Database tables initialized")
         return True
     except Exception as e:
         print(f"❌ Error initializing database: {e}")
         return False
-    finally:
-        cursor.close()
-        conn.close()
-
-# Initialize on startup
-init_db()
-
-# In-memory fallback for settings
-in_memory_settings = {
-    "source_channels": [],
-    "destination_channels": [],
-    "whitelist_words": [],
-    "blacklist_words": [],
-    "removed_words": [],
-    "file_prefix": "",
-    "file_suffix": "",
-    "remove_username": False,
-    "custom_caption": "",
-    "start_link": None,
-    "end_link": None,
-    "process_above_2gb": False,
-    "parallel_downloads": 1
-}
+
+SETTINGS_COLUMNS = [
+    "source_channels", "destination_channels", "whitelist_words", "blacklist_words", "removed_words",
+    "file_prefix", "file_suffix", "remove_username", "custom_caption", "start_link", "end_link",
+    "process_above_2gb", "parallel_downloads"
+]
+JSON_COLUMNS = {"source_channels", "destination_channels", "whitelist_words", "blacklist_words", "removed_words"}
+
+def default_settings():
+    return {
+        "source_channels": [],
+        "destination_channels": [],
+        "whitelist_words": [],
+        "blacklist_words": [],
+        "removed_words": [],
+        "file_prefix": "",
+        "file_suffix": "",
+        "remove_username": False,
+        "custom_caption": "",
+        "start_link": None,
+        "end_link": None,
+        "process_above_2gb": False,
+        "parallel_downloads": 1
+    }
+
+# Authoritative in-memory settings; PostgreSQL is written behind it
+in_memory_settings = default_settings()
+
+# Write-behind state: keys changed since the last flush
+SETTINGS_FLUSH_DELAY = 1.0  # Seconds to wait for more changes before writing
+dirty_keys = set()
+_flush_task = None
+_flush_lock = asyncio.Lock()  # Keeps flushes in order
+
+def row_to_settings(row):
+    """Convert a settings table row into a settings dict"""
+    return {
+        "source_channels": json.loads(row.get("source_channels") or "[]"),
+        "destination_channels": json.loads(row.get("destination_channels") or "[]"),
+        "whitelist_words": json.loads(row.get("whitelist_words") or "[]"),
+        "blacklist_words": json.loads(row.get("blacklist_words") or "[]"),
+        "removed_words": json.loads(row.get("removed_words") or "[]"),
+        "file_prefix": row.get("file_prefix") or "",
+        "file_suffix": row.get("file_suffix") or "",
+        "remove_username": row.get("remove_username") or False,
+        "custom_caption": row.get("custom_caption") or "",
+        "start_link": row.get("start_link"),
+        "end_link": row.get("end_link"),
+        "process_above_2gb": row.get("process_above_2gb") or False,
+        "parallel_downloads": row.get("parallel_downloads") or 1
+    }
+
+def _fetch_settings_row(row_id):
+    from psycopg2.extras import RealDictCursor
+    
+    with pooled_connection() as conn:
+        if not conn:
+            return None
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SELECT * FROM settings WHERE _id = %s", (row_id,))
+            row = cursor.fetchone()
+            return row_to_settings(row) if row else None
+
+def _write_settings_columns(row_id, settings_dict, keys):
+    """UPSERT a settings row, updating only the given columns on conflict"""
+    defaults = default_settings()
+    values = []
+    for column in SETTINGS_COLUMNS:
+        value = settings_dict.get(column, defaults[column])
+        values.append(json.dumps(value) if column in JSON_COLUMNS else value)
+    
+    updates = [f"{column} = EXCLUDED.{column}" for column in SETTINGS_COLUMNS if column in keys]
+    updates.append("updated_at = CURRENT_TIMESTAMP")
+    
+    with pooled_connection() as conn:
+        if not conn:
+            return False
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO settings
+                (_id, {", ".join(SETTINGS_COLUMNS)}, updated_at)
+                VALUES (%s, {", ".join(["%s"] * len(SETTINGS_COLUMNS))}, %s)
+                ON CONFLICT (_id) DO UPDATE SET
+                    {", ".join(updates)}
+            """, (row_id, *values, datetime.utcnow()))
+        return True
+
+def _upsert_settings_row(row_id, settings_dict):
+    return _write_settings_columns(row_id, settings_dict, SETTINGS_COLUMNS)
 
 def load_settings_sync():
     """Synchronously load settings from PostgreSQL or memory at startup"""
     global in_memory_settings
     
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT * FROM settings WHERE _id = %s", ("main_settings",))
-            row = cursor.fetchone()
-            
-            if row:
-                import json
-                in_memory_settings = {
-                    "source_channels": json.loads(row.get("source_channels") or "[]"),
-                    "destination_channels": json.loads(row.get("destination_channels") or "[]"),
-                    "whitelist_words": json.loads(row.get("whitelist_words") or "[]"),
-                    "blacklist_words": json.loads(row.get("blacklist_words") or "[]"),
-                    "removed_words": json.loads(row.get("removed_words") or "[]"),
-                    "file_prefix": row.get("file_prefix") or "",
-                    "file_suffix": row.get("file_suffix") or "",
-                    "remove_username": row.get("remove_username") or False,
-                    "custom_caption": row.get("custom_caption") or "",
-                    "start_link": row.get("start_link"),
-                    "end_link": row.get("end_link"),
-                    "process_above_2gb": row.get("process_above_2gb") or False,
-                    "parallel_downloads": row.get("parallel_downloads") or 1
-                }
-                print(f"✅ Settings loaded from PostgreSQL")
-                return in_memory_settings
-        except Exception as e:
-            print(f"❌ Error loading from PostgreSQL: {e}")
-        finally:
-            cursor.close()
-            conn.close()
+    try:
+        settings = with_retry(_fetch_settings_row, "main_settings")
+        if settings:
+            in_memory_settings = settings
+            dirty_keys.clear()
+            print(f"✅ Settings loaded from PostgreSQL")
+            return in_memory_settings
+    except Exception as e:
+        print(f"❌ Error loading from PostgreSQL: {e}")
     
     print(f"✅ Using in-memory settings")
     return in_memory_settings
 
+async def reload_settings():
+    """Reload settings from PostgreSQL into memory without blocking the loop"""
+    return await run_db(load_settings_sync)
+
+async def init_storage():
+    """Create tables and load settings (run once at startup)"""
+    await run_db(init_db)
+    return await reload_settings()
+
 async def load_settings():
-    """Load all settings from PostgreSQL or memory"""
-    global in_memory_settings
-    
-    conn = get_db_connection()
-    if conn:
+    """Current settings (memory is authoritative)"""
+    return dict(in_memory_settings)
+
+async def flush_settings():
+    """Write all pending setting changes in one statement"""
+    async with _flush_lock:
+        if not dirty_keys:
+            return True
+        
+        keys = set(dirty_keys)
+        dirty_keys.clear()
+        snapshot = dict(in_memory_settings)
+        
         try:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT * FROM settings WHERE _id = %s", ("main_settings",))
-            row = cursor.fetchone()
-            
-            if row:
-                import json
-                return {
-                    "source_channels": json.loads(row.get("source_channels") or "[]"),
-                    "destination_channels": json.loads(row.get("destination_channels") or "[]"),
-                    "whitelist_words": json.loads(row.get("whitelist_words") or "[]"),
-                    "blacklist_words": json.loads(row.get("blacklist_words") or "[]"),
-                    "removed_words": json.loads(row.get("removed_words") or "[]"),
-                    "file_prefix": row.get("file_prefix") or "",
-                    "file_suffix": row.get("file_suffix") or "",
-                    "remove_username": row.get("remove_username") or False,
-                    "custom_caption": row.get("custom_caption") or "",
-                    "start_link": row.get("start_link"),
-                    "end_link": row.get("end_link"),
-                    "process_above_2gb": row.get("process_above_2gb") or False,
-                    "parallel_downloads": row.get("parallel_downloads") or 1
-                }
+            if await run_db(_write_settings_columns, "main_settings", snapshot, keys):
+                return True
         except Exception as e:
-            print(f"❌ Error loading settings from PostgreSQL: {e}")
-        finally:
-            cursor.close()
-            conn.close()
-    
-    return in_memory_settings
+            print(f"❌ Error saving settings to PostgreSQL: {e}")
+        
+        # Keep the keys pending for the next flush
+        dirty_keys.update(keys)
+        return False
+
+async def _flush_later():
+    global _flush_task
+    try:
+        await asyncio.sleep(SETTINGS_FLUSH_DELAY)
+    finally:
+        _flush_task = None
+    await flush_settings()
+
+def mark_dirty(keys):
+    """Record changed keys and schedule a coalesced flush"""
+    global _flush_task
+    dirty_keys.update(keys)
+    if _flush_task is None:
+        _flush_task = asyncio.get_running_loop().create_task(_flush_later())
 
 async def save_settings(settings_dict):
-    """Save settings to PostgreSQL or memory"""
+    """Replace all settings (written to PostgreSQL in the background)"""
     global in_memory_settings
-    import json
     
-    in_memory_settings = settings_dict
-    
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO settings 
-                (_id, source_channels, destination_channels, whitelist_words, blacklist_words, removed_words,
-                 file_prefix, file_suffix, remove_username, custom_caption, start_link, end_link,
-                 process_above_2gb, parallel_downloads, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (_id) DO UPDATE SET
-                    source_channels = EXCLUDED.source_channels,
-                    destination_channels = EXCLUDED.destination_channels,
-                    whitelist_words = EXCLUDED.whitelist_words,
-                    blacklist_words = EXCLUDED.blacklist_words,
-                    removed_words = EXCLUDED.removed_words,
-                    file_prefix = EXCLUDED.file_prefix,
-                    file_suffix = EXCLUDED.file_suffix,
-                    remove_username = EXCLUDED.remove_username,
-                    custom_caption = EXCLUDED.custom_caption,
-                    start_link = EXCLUDED.start_link,
-                    end_link = EXCLUDED.end_link,
-                    process_above_2gb = EXCLUDED.process_above_2gb,
-                    parallel_downloads = EXCLUDED.parallel_downloads,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (
-                "main_settings",
-                json.dumps(settings_dict.get("source_channels", [])),
-                json.dumps(settings_dict.get("destination_channels", [])),
-                json.dumps(settings_dict.get("whitelist_words", [])),
-                json.dumps(settings_dict.get("blacklist_words", [])),
-                json.dumps(settings_dict.get("removed_words", [])),
-                settings_dict.get("file_prefix", ""),
-                settings_dict.get("file_suffix", ""),
-                settings_dict.get("remove_username", False),
-                settings_dict.get("custom_caption", ""),
-                settings_dict.get("start_link"),
-                settings_dict.get("end_link"),
-                settings_dict.get("process_above_2gb", False),
-                settings_dict.get("parallel_downloads", 1),
-                datetime.utcnow()
-            ))
-            
-            conn.commit()
-        except Exception as e:
-            print(f"❌ Error saving settings to PostgreSQL: {e}")
-        finally:
-            cursor.close()
-            conn.close()
+    in_memory_settings = {**default_settings(), **settings_dict}
+    mark_dirty(SETTINGS_COLUMNS)
 
 async def update_setting(key, value):
     """Update a single setting"""
-    global in_memory_settings
-    import json
-    
     in_memory_settings[key] = value
-    
-    # Load current settings and update
-    current = await load_settings()
-    current[key] = value
-    await save_settings(current)
+    mark_dirty([key])
 
 async def delete_setting(key):
     """Delete a specific setting (reset to default)"""
-    global in_memory_settings
-    
-    defaults = {
-        "source_channels": [],
-        "destination_channels": [],
-        "whitelist_words": [],
-        "blacklist_words": [],
-        "removed_words": [],
-        "file_prefix": "",
-        "file_suffix": "",
-        "remove_username": False,
-        "custom_caption": "",
-        "start_link": None,
-        "end_link": None,
-        "process_above_2gb": False,
-        "parallel_downloads": 1
-    }
+    defaults = default_settings()
     
     if key in defaults:
         in_memory_settings[key] = defaults[key]
-        current = await load_settings()
-        current[key] = defaults[key]
-        await save_settings(current)
+        mark_dirty([key])
 
 async def save_backup(settings_dict):
     """Save settings to backup in PostgreSQL (replaces old backup)"""
-    import json
+    try:
+        if await run_db(_upsert_settings_row, "backup_settings", settings_dict):
+            print("✅ Backup saved successfully to PostgreSQL")
+            return True
+    except Exception as e:
+        print(f"❌ Error saving backup: {e}")
+    return False
+
+async def load_backup():
+    """Load settings from PostgreSQL backup"""
+    try:
+        return await run_db(_fetch_settings_row, "backup_settings")
+    except Exception as e:
+        print(f"❌ Error loading backup: {e}")
+    return None
+
+def _get_processed_ids(source_chat, message_ids):
+    with pooled_connection() as conn:
+        if not conn:
+            return set()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT message_id FROM processed_files WHERE source_chat = %s AND message_id = ANY(%s)",
+                (source_chat, list(message_ids))
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+async def get_processed_ids(source_chat, message_ids):
+    """Return the subset of message_ids already mirrored from source_chat (one indexed query)"""
+    if not message_ids:
+        return set()
     
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            
+    try:
+        return await run_db(_get_processed_ids, source_chat, message_ids)
+    except Exception as e:
+        print(f"❌ Error reading processed files: {e}")
+    return set()
+
+def _get_known_unique_ids(file_unique_ids):
+    with pooled_connection() as conn:
+        if not conn:
+            return set()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT file_unique_id FROM processed_files WHERE file_unique_id = ANY(%s)",
+                (list(file_unique_ids),)
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+async def get_known_unique_ids(file_unique_ids):
+    """Return the subset of file_unique_ids already in the ledger (exact check)"""
+    if not file_unique_ids:
+        return set()
+    
+    try:
+        return await run_db(_get_known_unique_ids, file_unique_ids)
+    except Exception as e:
+        print(f"❌ Error reading file ids: {e}")
+    return set()
+
+def _load_unique_ids(add, batch_size):
+    count = 0
+    with pooled_connection() as conn:
+        if not conn:
+            return None
+        # Server-side cursor so large ledgers stream in batches
+        with conn.cursor(name="ledger_unique_ids") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute("SELECT file_unique_id FROM processed_files WHERE file_unique_id IS NOT NULL")
+            for row in cursor:
+                add(row[0])
+                count += 1
+    return count
+
+async def load_unique_ids(add, batch_size=10000):
+    """Stream every file_unique_id in the ledger into add(). Returns the count, or None if it could not be read."""
+    if not DATABASE_URL:
+        return 0
+    try:
+        return await run_db(_load_unique_ids, add, batch_size)
+    except Exception as e:
+        print(f"❌ Error loading file ids: {e}")
+    return None
+
+def _record_processed(source_chat, message_id, file_unique_id, file_name, dest_message_ids):
+    with pooled_connection() as conn:
+        if not conn:
+            return False
+        with conn.cursor() as cursor:
             cursor.execute("""
-                INSERT INTO settings 
-                (_id, source_channels, destination_channels, whitelist_words, blacklist_words, removed_words,
-                 file_prefix, file_suffix, remove_username, custom_caption, start_link, end_link,
-                 process_above_2gb, parallel_downloads, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (_id) DO UPDATE SET
-                    source_channels = EXCLUDED.source_channels,
-                    destination_channels = EXCLUDED.destination_channels,
-                    whitelist_words = EXCLUDED.whitelist_words,
-                    blacklist_words = EXCLUDED.blacklist_words,
-                    removed_words = EXCLUDED.removed_words,
-                    file_prefix = EXCLUDED.file_prefix,
-                    file_suffix = EXCLUDED.file_suffix,
-                    remove_username = EXCLUDED.remove_username,
-                    custom_caption = EXCLUDED.custom_caption,
-                    start_link = EXCLUDED.start_link,
-                    end_link = EXCLUDED.end_link,
-                    process_above_2gb = EXCLUDED.process_above_2gb,
-                    parallel_downloads = EXCLUDED.parallel_downloads,
-                    updated_at = CURRENT_TIMESTAMP
+                INSERT INTO processed_files
+                (source_chat, message_id, file_unique_id, file_name, dest_message_ids, processed_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (source_chat, message_id) DO UPDATE SET
+                    file_unique_id = EXCLUDED.file_unique_id,
+                    file_name = EXCLUDED.file_name,
+                    dest_message_ids = EXCLUDED.dest_message_ids,
+                    processed_at = EXCLUDED.processed_at
             """, (
-                "backup_settings",
-                json.dumps(settings_dict.get("source_channels", [])),
-                json.dumps(settings_dict.get("destination_channels", [])),
-                json.dumps(settings_dict.get("whitelist_words", [])),
-                json.dumps(settings_dict.get("blacklist_words", [])),
-                json.dumps(settings_dict.get("removed_words", [])),
-                settings_dict.get("file_prefix", ""),
-                settings_dict.get("file_suffix", ""),
-                settings_dict.get("remove_username", False),
-                settings_dict.get("custom_caption", ""),
-                settings_dict.get("start_link"),
-                settings_dict.get("end_link"),
-                settings_dict.get("process_above_2gb", False),
-                settings_dict.get("parallel_downloads", 1),
+                source_chat,
+                message_id,
+                file_unique_id,
+                file_name,
+                json.dumps(dest_message_ids),
                 datetime.utcnow()
             ))
-            
-            conn.commit()
-            print("✅ Backup saved successfully to PostgreSQL")
-            return True
-        except Exception as e:
-            print(f"❌ Error saving backup: {e}")
+        return True
+
+async def record_processed(source_chat, message_id, file_unique_id, file_name, dest_message_ids):
+    """Add a mirrored message to the ledger"""
+    try:
+        return await run_db(_record_processed, source_chat, message_id, file_unique_id, file_name, dest_message_ids)
+    except Exception as e:
+        print(f"❌ Error recording processed file: {e}")
+    return False
+
+def _create_job(source_chat, start_link, end_link, start_id, end_id):
+    with pooled_connection() as conn:
+        if not conn:
+            return None
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE jobs SET status = 'replaced' WHERE status IN ('running', 'paused')")
+            cursor.execute("""
+                INSERT INTO jobs (source_chat, start_link, end_link, start_id, end_id, checkpoint_id, status)
+                VALUES (%s, %s, %s, %s, %s, %s, 'running')
+                RETURNING id
+            """, (source_chat, start_link, end_link, start_id, end_id, start_id))
+            return cursor.fetchone()[0]
+
+async def create_job(source_chat, start_link, end_link, start_id, end_id):
+    """Create a running job record, superseding any unfinished one. Returns the job id."""
+    try:
+        return await run_db(_create_job, source_chat, start_link, end_link, start_id, end_id)
+    except Exception as e:
+        print(f"❌ Error creating job: {e}")
+    return None
+
+def _save_job_checkpoint(job_id, checkpoint_id, completed_ids, status):
+    with pooled_connection() as conn:
+        if not conn:
             return False
-        finally:
-            cursor.close()
-            conn.close()
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE jobs SET
+                    checkpoint_id = %s,
+                    completed_ids = %s,
+                    status = COALESCE(%s, status),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (checkpoint_id, json.dumps(sorted(completed_ids)), status, job_id))
+        return True
+
+async def save_job_checkpoint(job_id, checkpoint_id, completed_ids, status=None):
+    """Persist a job's checkpoint (and optionally its status)"""
+    if job_id is None:
+        return False
+    
+    try:
+        return await run_db(_save_job_checkpoint, job_id, checkpoint_id, completed_ids, status)
+    except Exception as e:
+        print(f"❌ Error saving job checkpoint: {e}")
     return False
 
-async def load_backup():
-    """Load settings from PostgreSQL backup"""
-    import json
+def _get_unfinished_job():
+    from psycopg2.extras import RealDictCursor
     
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT * FROM settings WHERE _id = %s", ("backup_settings",))
+    with pooled_connection() as conn:
+        if not conn:
+            return None
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT * FROM jobs WHERE status IN ('running', 'paused')
+                ORDER BY id DESC LIMIT 1
+            """)
             row = cursor.fetchone()
-            
-            if row:
-                return {
-                    "source_channels": json.loads(row.get("source_channels") or "[]"),
-                    "destination_channels": json.loads(row.get("destination_channels") or "[]"),
-                    "whitelist_words": json.loads(row.get("whitelist_words") or "[]"),
-                    "blacklist_words": json.loads(row.get("blacklist_words") or "[]"),
-                    "removed_words": json.loads(row.get("removed_words") or "[]"),
-                    "file_prefix": row.get("file_prefix") or "",
-                    "file_suffix": row.get("file_suffix") or "",
-                    "remove_username": row.get("remove_username") or False,
-                    "custom_caption": row.get("custom_caption") or "",
-                    "start_link": row.get("start_link"),
-                    "end_link": row.get("end_link"),
-                    "process_above_2gb": row.get("process_above_2gb") or False,
-                    "parallel_downloads": row.get("parallel_downloads") or 1
-                }
-        except Exception as e:
-            print(f"❌ Error loading backup: {e}")
-        finally:
-            cursor.close()
-            conn.close()
+            if not row:
+                return None
+            job = dict(row)
+            job["completed_ids"] = json.loads(row.get("completed_ids") or "[]")
+            return job
+
+async def get_unfinished_job():
+    """Latest job that was interrupted (crash) or cancelled, or None"""
+    try:
+        return await run_db(_get_unfinished_job)
+    except Exception as e:
+        print(f"❌ Error loading unfinished job: {e}")
     return None
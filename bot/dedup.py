@@ -0,0 +1,60 @@
+import math
+import time
+import asyncio
+import hashlib
+from bot.database import get_known_unique_ids, load_unique_ids
+
+class BloomFilter:
+    """Fixed-size probabilistic set: no false negatives, ~1% false positives at capacity"""
+    
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+    
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+# Every file_unique_id mirrored so far (loaded from the ledger on first use)
+seen_filter = BloomFilter()
+LOAD_RETRY_SECONDS = 60  # After a failed load, batches are not checked again for this long
+_loaded = False
+_retry_at = 0.0
+_load_lock = asyncio.Lock()
+
+async def load_seen_ids():
+    """Fill the filter from the ledger once per process; a failed load is retried later"""
+    global _loaded, _retry_at
+    if _loaded or time.monotonic() < _retry_at:
+        return
+    async with _load_lock:
+        if _loaded:
+            return
+        count = await load_unique_ids(seen_filter.add)
+        if count is None:
+            _retry_at = time.monotonic() + LOAD_RETRY_SECONDS
+            print(f"⚠️ Duplicate check off until the ledger can be read (retrying in {LOAD_RETRY_SECONDS}s)")
+            return
+        _loaded = True
+
+async def find_duplicates(unique_ids) -> set:
+    """Ids already mirrored: filter hits are confirmed against the ledger"""
+    await load_seen_ids()
+    candidates = [u for u in unique_ids if u and u in seen_filter]
+    if not candidates:
+        return set()
+    return await get_known_unique_ids(candidates)
+
+def remember(unique_id: str):
+    if unique_id:
+        seen_filter.add(unique_id)
@@ -0,0 +1,99 @@
+import os
+import math
+import asyncio
+from pyrogram.client import Client
+from pyrogram.types import Message
+from bot.config import Config
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # stream_media offsets and limits count 1 MiB chunks
+SEGMENT_RETRIES = 3
+
+class DownloadCancelled(Exception):
+    pass
+
+def preallocate(path: str, size: int):
+    """Create the file at its final size so segments can be written at their offsets"""
+    with open(path, "wb") as f:
+        if hasattr(os, "posix_fallocate"):
+            # Reserve real blocks so a full disk fails now, not halfway through
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+
+async def download_segment(client: Client, message: Message, path: str, first_chunk: int, chunk_count: int,
+                           on_chunk, is_cancelled=None):
+    """Fetch chunks [first_chunk, first_chunk + chunk_count) over their own media session"""
+    done = 0
+    attempt = 0
+    while done < chunk_count:
+        try:
+            with open(path, "r+b") as f:
+                f.seek((first_chunk + done) * DOWNLOAD_CHUNK_SIZE)
+                async for chunk in client.stream_media(message, limit=chunk_count - done, offset=first_chunk + done):
+                    if is_cancelled and is_cancelled():
+                        raise DownloadCancelled("Download cancelled")
+                    f.write(chunk)
+                    done += 1
+                    on_chunk(len(chunk))
+                    if len(chunk) < DOWNLOAD_CHUNK_SIZE:
+                        # Short chunk: end of file
+                        return
+            if done < chunk_count:
+                raise ValueError(f"stream ended after {done} of {chunk_count} chunks")
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            attempt += 1
+            if attempt > SEGMENT_RETRIES or (is_cancelled and is_cancelled()):
+                raise
+            # Resume the segment where it stopped
+            print(f"⚠️ Segment at chunk {first_chunk + done} failed ({e}), retrying")
+            await asyncio.sleep(attempt)
+
+async def download_file(client: Client, message: Message, path: str, file_size: int, progress=None, is_cancelled=None) -> str:
+    """Download message media to path, in parallel byte ranges for large files"""
+    segments = max(Config.DOWNLOAD_SEGMENTS, 1)
+    if segments == 1 or file_size < Config.SEGMENTED_MIN_MB * 1024 * 1024:
+        return await client.download_media(message, file_name=path, progress=progress)
+    
+    # Same temp name download_media uses, so disk accounting sees it
+    temp_path = path + ".temp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Without native fallocate glibc writes every block, so keep it off the event loop
+    await asyncio.to_thread(preallocate, temp_path, file_size)
+    
+    total_chunks = math.ceil(file_size / DOWNLOAD_CHUNK_SIZE)
+    chunks_per_segment = math.ceil(total_chunks / segments)
+    received = 0
+    
+    def on_chunk(size: int):
+        nonlocal received
+        received += size
+        if progress:
+            progress(min(received, file_size), file_size)
+    
+    tasks = [
+        asyncio.create_task(download_segment(
+            client, message, temp_path, first_chunk,
+            min(chunks_per_segment, total_chunks - first_chunk), on_chunk, is_cancelled
+        ))
+        for first_chunk in range(0, total_chunks, chunks_per_segment)
+    ]
+    
+    try:
+        await asyncio.gather(*tasks)
+        if received != file_size:
+            raise ValueError(f"Downloaded {received} of {file_size} bytes")
+    except BaseException:
+        # One failed segment stops the others before the partial file goes
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    
+    os.replace(temp_path, path)
+    return path
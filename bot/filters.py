@@ -1,3 +1,6 @@
+import re
+from bisect import bisect_right
+from functools import lru_cache
 from bot.config import Config
 
 def get_file_name(message):
@@ -13,33 +16,102 @@ def get_file_name(message):
         return message.caption
     return ""
 
+NAME_SEPARATOR = "\x00"  # Joins a batch of names into one string for a single scan
+
+class WordMatcher:
+    """All words of a list compiled into one pattern, so a name is scanned once"""
+    
+    def __init__(self, words: tuple):
+        self.words = words
+        # Longest first so the reported word is the most specific one at a position
+        usable = sorted({w for w in words if w and NAME_SEPARATOR not in w}, key=len, reverse=True)
+        self.pattern = re.compile("|".join(map(re.escape, usable))) if usable else None
+        self.match_empty = "" in words
+    
+    def find(self, name_lower: str):
+        """A word from the list found in the name, or None"""
+        if self.match_empty:
+            return ""
+        if not self.pattern:
+            return None
+        match = self.pattern.search(name_lower)
+        return match.group() if match else None
+    
+    def find_many(self, names_lower: list) -> list:
+        """find() for a whole batch in one pass over the joined names"""
+        if self.match_empty:
+            return ["" for _ in names_lower]
+        found = [None] * len(names_lower)
+        if not self.pattern or not names_lower:
+            return found
+        
+        starts = []
+        offset = 0
+        for name in names_lower:
+            starts.append(offset)
+            offset += len(name) + len(NAME_SEPARATOR)
+        
+        # Words never contain the separator, so a match never spans two names
+        for match in self.pattern.finditer(NAME_SEPARATOR.join(names_lower)):
+            index = bisect_right(starts, match.start()) - 1
+            if found[index] is None:
+                found[index] = match.group()
+        return found
+
+@lru_cache(maxsize=8)
+def get_matcher(words: tuple) -> WordMatcher:
+    """Compiled matcher for a word list (rebuilt only when the list changes)"""
+    return WordMatcher(words)
+
+def filter_verdict(blacklisted, whitelisted) -> tuple[bool, str]:
+    if blacklisted is not None:
+        return False, f"Blacklisted word: {blacklisted}"
+    if Config.WHITELIST_WORDS and whitelisted is None:
+        return False, "No whitelist word found"
+    return True, "OK"
+
 def should_process_file(file_name: str) -> tuple[bool, str]:
     if not file_name:
         return False, "No file name found"
     
     name_lower = file_name.lower()
+    blacklisted = get_matcher(tuple(Config.BLACKLIST_WORDS)).find(name_lower)
+    if blacklisted is not None:
+        return filter_verdict(blacklisted, None)
+    whitelisted = get_matcher(tuple(Config.WHITELIST_WORDS)).find(name_lower)
+    return filter_verdict(None, whitelisted)
+
+def classify_names(file_names: list) -> list:
+    """should_process_file() for a batch of names, one scan per word list"""
+    names_lower = [name.lower() if name else "" for name in file_names]
+    blacklisted = get_matcher(tuple(Config.BLACKLIST_WORDS)).find_many(names_lower)
+    whitelisted = get_matcher(tuple(Config.WHITELIST_WORDS)).find_many(names_lower)
     
-    if Config.BLACKLIST_WORDS:
-        for word in Config.BLACKLIST_WORDS:
-            if word in name_lower:
-                return False, f"Blacklisted word: {word}"
-    
-    if Config.WHITELIST_WORDS:
-        found = False
-        for word in Config.WHITELIST_WORDS:
-            if word in name_lower:
-                found = True
-                break
-        if not found:
-            return False, "No whitelist word found"
-    
-    return True, "OK"
+    verdicts = []
+    for name, black, white in zip(file_names, blacklisted, whitelisted):
+        if not name:
+            verdicts.append((False, "No file name found"))
+        else:
+            verdicts.append(filter_verdict(black, white))
+    return verdicts
+
+USERNAME_PATTERN = re.compile(r'@\w+')
+TAMILMV_PATTERN = re.compile(r'www\.1tamilmv\.\S+\s*')
+SPACES_PATTERN = re.compile(r'\s+')
+RENAME_CACHE_SIZE = 8192
+
+def rename_settings() -> tuple:
+    """Every setting rename_file depends on; doubles as the cache version"""
+    return (Config.REMOVE_USERNAME, tuple(Config.REMOVED_WORDS), Config.FILE_PREFIX, Config.FILE_SUFFIX)
 
 def rename_file(original_name: str) -> str:
-    import re
-    
     if not original_name:
         return original_name
+    return rename_with_settings(original_name, rename_settings())
+
+@lru_cache(maxsize=RENAME_CACHE_SIZE)
+def rename_with_settings(original_name: str, settings: tuple) -> str:
+    remove_username, removed_words, prefix, suffix = settings
     
     name_parts = original_name.rsplit('.', 1)
     
@@ -53,24 +125,24 @@ def rename_file(original_name: str) -> str:
     base_name = base_name.replace('_', ' ')
     
     # Step 2: Remove @username patterns from ANYWHERE in filename if enabled
-    if Config.REMOVE_USERNAME:
-        base_name = re.sub(r'@\w+', '', base_name)  # Fixed: \S+ was too greedy
+    if remove_username:
+        base_name = USERNAME_PATTERN.sub('', base_name)
     
     # Step 3: Remove www.1tamilmv.* patterns (where * is dynamic)
-    base_name = re.sub(r'www\.1tamilmv\.\S+\s*', '', base_name)
+    base_name = TAMILMV_PATTERN.sub('', base_name)
     
     # Step 4: Remove specified words (case-sensitive exact match)
-    if Config.REMOVED_WORDS:
-        for word in Config.REMOVED_WORDS:
-            base_name = base_name.replace(word, '')
+    # In list order: with overlapping tags (Rip, HDRip) the order decides what is left
+    for word in removed_words:
+        base_name = base_name.replace(word, '')
     
     # Step 5: Clean up extra spaces (multiple spaces to single space)
-    base_name = re.sub(r'\s+', ' ', base_name)
+    base_name = SPACES_PATTERN.sub(' ', base_name)
     base_name = base_name.strip()
     
     # Step 6: Add prefix and suffix
     if base_name:  # Only add prefix/suffix if there's actual content left
-        new_name = f"{Config.FILE_PREFIX}{base_name}{Config.FILE_SUFFIX}"
+        new_name = f"{prefix}{base_name}{suffix}"
     else:
         new_name = original_name  # Fallback to original if everything was removed
     
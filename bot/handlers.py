@@ -7,12 +7,15 @@ from pyrogram.client import Client
 from pyrogram import filters
 from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from bot.config import Config
-from bot.thumbnail import save_thumbnail, delete_thumbnail, has_thumbnail, get_thumbnail
-from bot.processor import process_range, get_status_text, current_status
-from bot.database import update_setting, save_settings, save_backup, load_backup
+from bot.thumbnail import save_thumbnail, delete_thumbnail, has_thumbnail, get_thumbnail_bytes, thumbnail_file
+from bot.processor import process_range, get_status_text, current_status, cancel_job
+from bot.database import update_setting, save_settings, save_backup, load_backup, get_unfinished_job
 
 user_data: dict[int, dict] = {}
 
+# Set by main once stored settings are applied; until then updates wait instead of seeing empty Config
+settings_ready = asyncio.Event()
+
 def is_owner(_, __, message: Message):
     return message.from_user and message.from_user.id == Config.OWNER_ID
 
@@ -189,7 +192,52 @@ def get_settings_text():
 Click a button below to edit.
     """
 
+async def run_job(client: Client, job: dict, status_msg: Message):
+    """Resume a job from its checkpoint and report the summary on status_msg"""
+    final_text = "Processing complete!"
+    try:
+        _, summary = await process_range(
+            client,
+            job['start_link'],
+            job['end_link'],
+            status_msg,
+            job=job
+        )
+        final_text = summary
+    except Exception as e:
+        final_text = f"Error: {e}"
+    
+    try:
+        await status_msg.edit_text(final_text, reply_markup=get_main_menu())
+    except:
+        pass
+
+async def resume_unfinished_job(client: Client):
+    """On startup, continue a job that was interrupted by a crash or restart"""
+    job = await get_unfinished_job()
+    if not job or job['status'] != 'running':
+        return
+    
+    try:
+        status_msg = await client.send_message(
+            Config.OWNER_ID,
+            f"♻️ **Resuming interrupted job**\n\n"
+            f"Start: {job['start_link']}\n"
+            f"End: {job['end_link']}\n"
+            f"Checkpoint: message {job['checkpoint_id']}"
+        )
+    except Exception as e:
+        print(f"⚠️ Could not resume job {job['id']}: {e}")
+        return
+    
+    asyncio.create_task(run_job(client, job, status_msg))
+
 def register_handlers(app: Client):
+
+    @app.on_message(group=-1)
+    @app.on_callback_query(group=-1)
+    async def wait_for_settings(client: Client, update):
+        await settings_ready.wait()
     
     @app.on_message(filters.command("start") & filters.private)
     async def start_command(client: Client, message: Message):
@@ -354,7 +402,7 @@ Current: {Config.CUSTOM_CAPTION or 'None'}
 - Status: {'✅ Set' if has_thumbnail() else '❌ Not set'}
 
 **📺 PREMIUM MODE** (✅ {'ON' if Config.PROCESS_ABOVE_2GB else 'OFF'})
-- OFF: Skip files >2GB (Telegram free limit)
+- OFF: Skip files >2GB unless a premium user session (SESSION_STRING) is connected
 - ON: Process all files including >2GB (Telegram Premium)
 - Files skipped show: "⏭️ SKIP: filename - ⚠️ NOT PREMIUM USER"
 
@@ -601,15 +649,14 @@ Current: {Config.CUSTOM_CAPTION or 'None'}
     
     @app.on_callback_query(filters.regex("^send_thumb$") & owner_callback_filter)
     async def send_thumb_callback(client: Client, callback: CallbackQuery):
-        thumb_path = get_thumbnail()
-        if thumb_path and os.path.exists(thumb_path):
+        photo_file = thumbnail_file(get_thumbnail_bytes())
+        if photo_file:
             try:
-                with open(thumb_path, 'rb') as photo_file:
-                    await client.send_photo(
-                        callback.from_user.id,
-                        photo_file,
-                        caption="📸 Your current thumbnail (320x320)\n\nThis is your thumbnail that will be used for all uploads"
-                    )
+                await client.send_photo(
+                    callback.from_user.id,
+                    photo_file,
+                    caption="📸 Your current thumbnail (320x320)\n\nThis is your thumbnail that will be used for all uploads"
+                )
                 await callback.answer("✅ Thumbnail sent to your chat!")
             except Exception as e:
                 print(f"Error sending thumbnail: {e}")
@@ -736,7 +783,7 @@ Current: {Config.CUSTOM_CAPTION or 'None'}
         )
         await callback.answer()
     
-    @app.on_message(filters.private & owner_filter & ~filters.command(["start", "help", "status", "setrange", "process", "setthumb", "delthumb", "setwhitelist", "setblacklist", "setsource", "setdest", "setprefix", "setsuffix", "restart"]))
+    @app.on_message(filters.private & owner_filter & ~filters.command(["start", "help", "status", "setrange", "process", "setthumb", "delthumb", "setwhitelist", "setblacklist", "setsource", "setdest", "setprefix", "setsuffix", "restart", "resume"]))
     async def handle_user_input(client: Client, message: Message):
         user_id = message.from_user.id
         data = user_data.get(user_id, {})
@@ -993,6 +1040,7 @@ Add captions when uploading with variables:
 **🎯 PROCESSING:**
 
 /process - Start downloading and uploading files
+/resume - Continue an interrupted or cancelled job
 /status - View real-time progress
 🛑 Cancel - Stop processing
 
@@ -1153,6 +1201,25 @@ Add captions when uploading with variables:
         except:
             pass
     
+    @app.on_message(filters.command("resume") & filters.private & owner_filter)
+    async def resume_command(client: Client, message: Message):
+        if current_status['running'] or current_status['status'] != 'idle':
+            await message.reply_text("⚠️ A job is already running. Use /status to view it.")
+            return
+        
+        job = await get_unfinished_job()
+        if not job:
+            await message.reply_text("✅ No unfinished job to resume.", reply_markup=get_main_menu())
+            return
+        
+        status_msg = await message.reply_text(
+            f"♻️ **Resuming job**\n\n"
+            f"Start: {job['start_link']}\n"
+            f"End: {job['end_link']}\n"
+            f"Checkpoint: message {job['checkpoint_id']}"
+        )
+        await run_job(client, job, status_msg)
+    
     @app.on_message(filters.command("setthumb") & filters.private & owner_filter)
     async def setthumb_command(client: Client, message: Message):
         if not message.reply_to_message or not message.reply_to_message.photo:
@@ -1179,7 +1246,7 @@ Add captions when uploading with variables:
                 os.remove(temp_path)
             except:
                 pass
-                
+        
         except Exception as e:
             await status_msg.edit_text(f"Error: {e}")
     
@@ -1395,8 +1462,7 @@ Add captions when uploading with variables:
     
     @app.on_callback_query(filters.regex("^cancel_all_now$") & owner_callback_filter)
     async def cancel_all_callback(client: Client, callback: CallbackQuery):
-        current_status['cancel_all'] = True
-        current_status['cancel_current_file'] = True
+        cancel_job()
         await callback.answer()
         
         # Delete downloaded files
@@ -1422,13 +1488,17 @@ Add captions when uploading with variables:
         # Auto-restart in background after 1 second
         async def auto_restart():
             await asyncio.sleep(1)
+            # A job still winding down resets the status itself when it returns
+            if current_status['running']:
+                return
             current_status['status'] = 'idle'
             current_status['file_name'] = None
             current_status['cancel_all'] = False
             current_status['cancel_current_file'] = False
             current_status['processed'] = 0
             current_status['total'] = 0
-            current_status['queue'] = []
+            current_status['queue'].clear()
+            current_status['transfers'] = {}
         
         asyncio.create_task(auto_restart())
     
@@ -1449,19 +1519,22 @@ Add captions when uploading with variables:
         # Clear user session data
         user_data.clear()
         
-        # Reset processing status
-        current_status['status'] = 'idle'
-        current_status['file_name'] = None
-        current_status['paused'] = False
-        current_status['cancel_all'] = False
-        current_status['cancel_current_file'] = False
-        current_status['processed'] = 0
-        current_status['total'] = 0
-        current_status['queue'] = []
-        
-        # Reload settings from database
-        from bot.database import load_settings_sync
-        settings = load_settings_sync()
+        # Reset processing status (a running job keeps its own until it returns)
+        if not current_status['running']:
+            current_status['status'] = 'idle'
+            current_status['file_name'] = None
+            current_status['paused'] = False
+            current_status['cancel_all'] = False
+            current_status['cancel_current_file'] = False
+            current_status['processed'] = 0
+            current_status['total'] = 0
+            current_status['queue'].clear()
+            current_status['transfers'] = {}
+        
+        # Reload settings from database (after writing pending changes)
+        from bot.database import reload_settings, flush_settings
+        await flush_settings()
+        settings = await reload_settings()
         Config.SOURCE_CHANNEL_IDS = settings.get("source_channels", [])
         Config.DESTINATION_CHANNEL_IDS = settings.get("destination_channels", [])
         Config.WHITELIST_WORDS = settings.get("whitelist_words", [])
@@ -1473,6 +1546,7 @@ Add captions when uploading with variables:
         Config.START_LINK = settings.get("start_link")
         Config.END_LINK = settings.get("end_link")
         Config.PROCESS_ABOVE_2GB = settings.get("process_above_2gb", False)
+        Config.PARALLEL_DOWNLOADS = settings.get("parallel_downloads", 1)
         
         # Step 3: Delete the restarting message and send success message
         if restart_msg:
@@ -1521,7 +1595,7 @@ Add captions when uploading with variables:
             )
             await callback.message.edit_text(success_msg, reply_markup=get_settings_menu())
             await callback.answer("✅ Backup created!")
-                
+        
         except Exception as e:
             await callback.answer(f"❌ Error: {e}", show_alert=True)
     
@@ -1563,7 +1637,7 @@ Add captions when uploading with variables:
 **Options:**
 - Click ✏️ Edit to paste edited JSON
 - Click ✅ Confirm to apply these settings"""
-            
+
             restore_buttons = InlineKeyboardMarkup([
                 [
                     InlineKeyboardButton("✏️ Edit", callback_data="edit_backup"),
@@ -1574,7 +1648,7 @@ Add captions when uploading with variables:
             
             await callback.message.edit_text(text_msg, reply_markup=restore_buttons)
             await callback.answer()
-            
+        
         except Exception as e:
             print(f"❌ Restore error: {e}")
             await callback.answer(f"❌ Error: {e}", show_alert=True)
@@ -1664,7 +1738,7 @@ Add captions when uploading with variables:
                 )
                 await callback.message.edit_text(success_msg, reply_markup=get_settings_menu())
             await callback.answer("✅ Settings applied!")
-            
+        
         except Exception as e:
             print(f"❌ Confirm error: {e}")
             await callback.answer(f"❌ Error: {e}", show_alert=True)
@@ -1705,7 +1779,7 @@ Add captions when uploading with variables:
             ])
             
             await message.reply_text(success_msg, reply_markup=confirm_buttons)
-            
+        
         except json.JSONDecodeError as e:
             print(f"❌ JSON parse error: {e}")
             await message.reply_text(f"❌ Invalid JSON: {e}\n\nPlease try again.", reply_markup=get_cancel_button())
@@ -1833,7 +1907,7 @@ Add captions when uploading with variables:
             print(f"[IMPORT] Sending success message")
             await loading_msg.edit_text(success_text, reply_markup=get_settings_menu())
             print(f"[IMPORT] Import completed successfully!")
-            
+        
         except json.JSONDecodeError as e:
             print(f"[IMPORT] JSON decode error: {e}")
             await message.reply_text(f"❌ Invalid JSON file: {e}", reply_markup=get_settings_menu())
@@ -1922,7 +1996,7 @@ Add captions when uploading with variables:
             
             print(f"[IMPORT-TEXT] Import completed successfully!")
             await loading_msg.edit_text(success_text, reply_markup=get_settings_menu())
-            
+        
         except json.JSONDecodeError as e:
             print(f"[IMPORT-TEXT] JSON decode error: {e}")
             await message.reply_text(f"❌ Invalid JSON format: {e}", reply_markup=get_settings_menu())
@@ -1931,5 +2005,5 @@ Add captions when uploading with variables:
             print(f"[IMPORT-TEXT] Error: {type(e).__name__}: {e}")
             await message.reply_text(f"❌ Error importing JSON: {e}", reply_markup=get_settings_menu())
             user_data[user_id]['waiting_for'] = None
-
+    
     return app
@@ -0,0 +1,82 @@
+import re
+from functools import lru_cache
+from bot.config import Config
+
+# (language, subtitle abbreviation, aliases) - earlier rows win when a name mentions several
+LANGUAGES = [
+    ("English", "Esub", ["english", "eng", "esub"]),
+    ("Hindi", "Hsub", ["hindi", "hin", "hsub"]),
+    ("Telugu", "Tesub", ["telugu", "tel", "tesub"]),
+    ("Kannada", "Ksub", ["kannada", "kan", "ksub"]),
+    ("Tamil", "Tsub", ["tamil", "tam", "tsub"]),
+    ("Malayalam", "Msub", ["malayalam", "mal", "msub"]),
+    ("Punjabi", "Psub", ["punjabi", "pan", "psub"]),
+]
+
+PREFIX_MIN_LENGTH = 4  # Aliases this long also match glued tokens like "tamilhd" or "esubs"
+SHORT_ALIAS_TAGS = r"(?:subs?|dub(?:bed|s)?)?"  # What may follow a short alias in the same token
+LANGUAGE_CACHE_SIZE = 65536
+
+alias_index = {}  # alias -> row index
+alias_pattern = None
+
+def build_alias_index():
+    """Compile the table into one token-bounded alternation used by the detector"""
+    global alias_pattern
+    alias_index.clear()
+    for index, (_, _, aliases) in enumerate(LANGUAGES):
+        for alias in aliases:
+            alias_index.setdefault(alias.lower(), index)
+    
+    # Longer aliases may run into the next token ("tamilhd", "esubs"); short ones must stand alone
+    # or carry a subtitle/dub tag ("EngSub", "HinDub"), so "tel" in "hotel" does not count
+    by_length = sorted(alias_index, key=len, reverse=True)
+    glued = "|".join(re.escape(a) for a in by_length if len(a) >= PREFIX_MIN_LENGTH)
+    alone = "|".join(re.escape(a) for a in by_length if len(a) < PREFIX_MIN_LENGTH)
+    alternatives = [f"(?:{glued})" if glued else None, f"(?:{alone})(?={SHORT_ALIAS_TAGS}(?![a-z]))" if alone else None]
+    alias_pattern = re.compile(r"(?<![a-z])(?:" + "|".join(a for a in alternatives if a) + ")") if alias_index else None
+    detect_language.cache_clear()
+
+def register_language(language: str, sub_abbr: str, aliases: list):
+    """Add a language (or more aliases for a known one) to the table"""
+    for row in LANGUAGES:
+        if row[0].lower() == language.lower():
+            row[2].extend(a.lower() for a in aliases if a.lower() not in row[2])
+            break
+    else:
+        LANGUAGES.append((language, sub_abbr, [a.lower() for a in aliases]))
+    build_alias_index()
+
+def load_extra_languages(spec: str):
+    """Parse "Bengali:Bsub:bengali,ben,bsub;Marathi:Msub:marathi" into the table"""
+    for entry in spec.split(";"):
+        parts = [p.strip() for p in entry.split(":")]
+        if len(parts) == 3 and parts[0] and parts[2]:
+            register_language(parts[0], parts[1], [a.strip() for a in parts[2].split(",") if a.strip()])
+
+@lru_cache(maxsize=LANGUAGE_CACHE_SIZE)
+def detect_language(file_name: str) -> tuple:
+    """One scan over the name; the lowest table row mentioned wins"""
+    file_lower = file_name.lower()
+    best = len(LANGUAGES)
+    
+    if alias_pattern:
+        for match in alias_pattern.finditer(file_lower):
+            best = min(best, alias_index[match.group()])
+            if best == 0:
+                break
+    
+    if best == len(LANGUAGES):
+        return "Unknown", ""
+    language, sub_abbr, _ = LANGUAGES[best]
+    return language, sub_abbr if "sub" in file_lower else ""
+
+def extract_language_and_subtitle(file_name: str) -> tuple:
+    """Extract language and subtitle from filename - leech bot style"""
+    if not file_name:
+        return "Unknown", ""
+    return detect_language(file_name)
+
+build_alias_index()
+if Config.EXTRA_LANGUAGES:
+    load_extra_languages(Config.EXTRA_LANGUAGES)
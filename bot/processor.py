@@ -1,36 +1,59 @@
 import os
-import re
 import asyncio
 import time
 from pyrogram.client import Client
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from pyrogram.enums import ParseMode
-from typing import List, Tuple
+from collections import deque
+from itertools import islice
+from typing import List
 from bot.config import Config
-from bot.filters import get_file_name, should_process_file, rename_file, has_downloadable_media
-from bot.thumbnail import get_thumbnail
+from bot.client import client_pool
+from bot.filters import get_file_name, should_process_file, classify_names, rename_file, has_downloadable_media
+from bot.thumbnail import load_thumbnails, invalidate_thumbnails, prepare_thumbnails, thumbnail_file, has_any_thumbnail
+from bot.relay import relay_document
+from bot.downloader import download_file
+from bot.uploader import send_big_document
+from bot.staging import disk_budget, PrefetchBudget
+from bot.publisher import StatusPublisher
+from bot.language import extract_language_and_subtitle
+from bot.database import get_processed_ids, record_processed, create_job, save_job_checkpoint
+from bot.dedup import find_duplicates, remember
 
 # Global state
 current_status = {
     'status': 'idle',
     'file_name': None,
-    'current_size': 0,
-    'total_size': 0,
-    'current_index': 0,  # Current file being processed (1-based)
+    'current_index': 0,  # Files started so far (1-based)
     'processed': 0,      # Completed files count
     'total': 0,          # Total files in range
-    'download_speed': 0,
-    'upload_speed': 0,
     'cancel_all': False,
-    'queue': [],
+    'cancel_event': None,  # Set on cancel; lives until the job's process_range returns
+    'running': False,      # True from the start of process_range until it returns
+    'transfers': {},     # Active transfers keyed by message id
+    'queue': deque(),    # Planned entries not yet picked up by a worker (display only)
     'skipped': 0,        # Skipped file count
     'premium_count': 0,  # Premium files count (>2GB)
     'to_process': 0,     # Files to process (total - skipped)
+    'duplicates': 0,     # Files skipped as already-mirrored media
+    'passthrough': 0,    # Files sent by reference (no download)
+    'transferred': 0,    # Files downloaded and re-uploaded
+    'scanned': 0,        # Message ids fetched so far
+    'scan_total': 0,     # Message ids in range
+    'unread': 0,         # Message ids whose batch could not be fetched
 }
 
-# Speed tracking
-dl_speed_data = {'last_time': 0, 'last_bytes': 0}
-ul_speed_data = {'last_time': 0, 'last_bytes': 0}
+# Pipeline queue bounds (memory stays flat regardless of range size)
+SCAN_QUEUE_SIZE = 4  # Scanned batches waiting for the planner
+TRANSFER_QUEUE_SIZE = 50
+SIZE_2GB = 2 * 1024 * 1024 * 1024
+
+
+def cancel_job():
+    """Cancel the running job; the flag stays set until process_range returns"""
+    current_status['cancel_all'] = True
+    current_status['cancel_current_file'] = True
+    if current_status['cancel_event'] is not None:
+        current_status['cancel_event'].set()
 
 def format_bytes(bytes_val: int) -> str:
     val = float(bytes_val)
@@ -53,94 +76,142 @@ def get_cancel_button():
         [InlineKeyboardButton("❌ Cancel All", callback_data="cancel_all_now")]
     ])
 
-def extract_language_and_subtitle(file_name: str) -> tuple:
-    """Extract language and subtitle from filename - leech bot style"""
-    if not file_name:
-        return "Unknown", ""
-    
-    file_lower = file_name.lower()
-    
-    # Language patterns - ORDERED FROM MOST SPECIFIC
-    lang_patterns = [
-        (r'\[?english\]?|\[?eng\]?|esub', ('English', 'Esub')),
-        (r'\[?hindi\]?|\[?hin\]?|hsub', ('Hindi', 'Hsub')),
-        (r'\[?telugu\]?|\[?tel\]?|tesub', ('Telugu', 'Tesub')),
-        (r'\[?kannada\]?|\[?kan\]?|ksub', ('Kannada', 'Ksub')),
-        (r'\[?tamil\]?|\[?tam\]?|tsub', ('Tamil', 'Tsub')),
-        (r'\[?malayalam\]?|\[?mal\]?|msub', ('Malayalam', 'Msub')),
-        (r'\[?punjabi\]?|\[?pan\]?|psub', ('Punjabi', 'Psub')),
-    ]
-    
-    for pattern, (lang, sub_abbr) in lang_patterns:
-        if re.search(pattern, file_lower):
-            subtitle = sub_abbr if re.search(r'esub|hsub|tesub|ksub|tsub|msub|psub|sub', file_lower) else ""
-            return lang, subtitle
+def shorten_name(name: str, limit: int = 32) -> str:
+    if len(name) <= limit:
+        return name
+    name_parts = name.rsplit('.', 1)
+    if len(name_parts) == 2:
+        base, ext = name_parts
+        return base[:limit - 4] + ".." + "." + ext
+    return name[:limit] + ".."
+
+def new_transfer(queue_item: "QueueItem", index: int) -> dict:
+    """Register an active transfer for the status view"""
+    transfer = {
+        'index': index,
+        'file_name': queue_item.name,
+        'phase': 'downloading',
+        'current': 0,
+        'total': queue_item.file_size,
+        'speed': 0,
+        'last_time': time.time(),
+        'last_bytes': 0,
+    }
+    current_status['transfers'][queue_item.msg_id] = transfer
+    return transfer
+
+def set_transfer_phase(transfer: dict, phase: str, total: int):
+    transfer['phase'] = phase
+    transfer['current'] = 0
+    transfer['total'] = total
+    transfer['speed'] = 0
+    transfer['last_time'] = time.time()
+    transfer['last_bytes'] = 0
+
+def make_progress_callback(transfer: dict):
+    """Progress callback that tracks bytes and speed for one transfer"""
+    def progress(current, total):
+        if current_status['cancel_all']:
+            return
+        transfer['current'] = current
+        if total > 0:
+            transfer['total'] = total
+        
+        now = time.time()
+        elapsed = now - transfer['last_time']
+        
+        if elapsed > 0.5:
+            bytes_in_period = current - transfer['last_bytes']
+            transfer['speed'] = bytes_in_period / elapsed
+            transfer['last_bytes'] = current
+            transfer['last_time'] = now
     
-    return "Unknown", ""
+    return progress
 
 def get_status_text() -> str:
     """Real-time progress UI with new design"""
     global current_status
     
     status = current_status['status']
-    file_name = current_status.get('file_name', 'Unknown')
-    current_index = current_status.get('current_index', 0)  # Which file we're on (1-based)
+    current_index = current_status.get('current_index', 0)  # Files started so far
     processed = current_status.get('processed', 0)  # Completed files
     total = current_status.get('total', 0)
     skipped = current_status.get('skipped', 0)
     premium_count = current_status.get('premium_count', 0)
     to_process = current_status.get('to_process', 0)
-    current_sz = current_status.get('current_size', 0)
-    total_sz = current_status.get('total_size', 0)
-    dl_speed = current_status.get('download_speed', 0)
-    ul_speed = current_status.get('upload_speed', 0)
-    queue = current_status.get('queue', [])
+    queue = current_status.get('queue') or deque()
+    transfers = list(current_status.get('transfers', {}).values())
     
     if status == 'idle':
         return "✅ Ready to process"
     
+    if status == 'fetching' and not transfers:
+        scanned = current_status.get('scanned', 0)
+        scan_total = current_status.get('scan_total', 0)
+        scan_pct = (scanned / scan_total * 100) if scan_total > 0 else 0
+        text = f"<b>🔍 SCANNING</b> {scanned}/{scan_total}\n\n"
+        text += f"{get_progress_bar(scanned, scan_total)} <b>{scan_pct:.0f}%</b>\n"
+        text += f"<b>📥</b> Files found: {total}"
+        return text
+    
     # Phase indicator
-    if status == 'downloading':
+    downloading = sum(1 for t in transfers if t['phase'] == 'downloading')
+    uploading = sum(1 for t in transfers if t['phase'] == 'uploading')
+    relaying = sum(1 for t in transfers if t['phase'] == 'relaying')
+    waiting = sum(1 for t in transfers if t['phase'] == 'waiting')
+    if len(transfers) > 1:
+        phase = f"⚡ TRANSFERRING ×{len(transfers)}"
+        current_phase = f"{downloading} downloading, {uploading} uploading, {relaying} relaying"
+        if waiting:
+            current_phase += f", {waiting} waiting for disk"
+    elif downloading:
         phase = "📥 DOWNLOADING"
-        speed = dl_speed
         current_phase = "Downloading"
-    else:
+    elif uploading:
         phase = "📤 UPLOADING"
-        speed = ul_speed
         current_phase = "Uploading"
-    
-    # Progress calculation
-    progress_pct = (current_sz / total_sz * 100) if total_sz > 0 else 0
-    progress_bar = get_progress_bar(current_sz, total_sz)
+    elif relaying:
+        phase = "🔁 RELAYING"
+        current_phase = "Relaying"
+    elif waiting:
+        phase = "💽 WAITING FOR DISK"
+        current_phase = "Waiting for disk space"
+    else:
+        phase = "🔗 FORWARDING"
+        current_phase = "Passthrough"
     
     # Calculate remaining files to process
     remaining = total - processed - skipped
     
     # Build new UI - show current file index / total
     text = f"<b>{phase}</b> {current_index}/{to_process}\n\n"
-    text += f"<b>📄 {file_name}</b>\n\n"
-    text += f"{progress_bar} <b>{progress_pct:.0f}%</b>\n"
-    text += f"<b>💾</b> {format_bytes(current_sz)} / {format_bytes(total_sz)}\n"
-    text += f"<b>🚀</b> {format_bytes(speed)}/s\n"
+    
+    if len(transfers) == 1:
+        t = transfers[0]
+        progress_pct = (t['current'] / t['total'] * 100) if t['total'] > 0 else 0
+        text += f"<b>📄 {t['file_name']}</b>\n\n"
+        text += f"{get_progress_bar(t['current'], t['total'])} <b>{progress_pct:.0f}%</b>\n"
+        text += f"<b>💾</b> {format_bytes(t['current'])} / {format_bytes(t['total'])}\n"
+        text += f"<b>🚀</b> {format_bytes(t['speed'])}/s\n"
+    elif transfers:
+        for t in sorted(transfers, key=lambda t: t['index']):
+            icon = {'downloading': "📥", 'uploading': "📤", 'relaying': "🔁", 'waiting': "💽"}.get(t['phase'], "🔗")
+            progress_pct = (t['current'] / t['total'] * 100) if t['total'] > 0 else 0
+            text += f"{icon} <b>{shorten_name(t['file_name'])}</b>\n"
+            text += f"{get_progress_bar(t['current'], t['total'], 8)} {progress_pct:.0f}% • "
+            text += f"{format_bytes(t['current'])} / {format_bytes(t['total'])} • {format_bytes(t['speed'])}/s\n"
+        total_speed = sum(t['speed'] for t in transfers)
+        text += f"\n<b>🚀 Total:</b> {format_bytes(total_speed)}/s\n"
     
     # Queue display - minimum 5 files
     if queue:
         text += f"\n<b>━━━━━━━━━━━━━━━━━━</b>\n"
         text += f"<b>📋 QUEUE ({len(queue)}+):</b>\n"
         
-        for i, q_file in enumerate(queue[:5]):
-            q_name = q_file['name']
-            skip_reason = q_file.get('skip_reason', None)
-            is_premium = q_file.get('premium', False)
-            
-            # Truncate name
-            if len(q_name) > 32:
-                name_parts = q_name.rsplit('.', 1)
-                if len(name_parts) == 2:
-                    base, ext = name_parts
-                    q_name = base[:28] + ".." + "." + ext
-                else:
-                    q_name = q_name[:32] + ".."
+        for i, q_file in enumerate(islice(queue, 5)):
+            q_name = shorten_name(q_file.name)
+            skip_reason = q_file.skip_reason
+            is_premium = q_file.premium
             
             # Determine indicator
             if skip_reason:
@@ -159,24 +230,671 @@ def get_status_text() -> str:
     # Progress section with file counts
     text += f"\n<b>━━━━━━━━━━━━━━━━━━</b>\n"
     text += f"<b>📈 PROGRESS:</b>\n"
-    text += f"  ✅ Processed: {processed}\n"
+    text += f"  ✅ Processed: {processed}"
+    text += f" (🔗 {current_status.get('passthrough', 0)} passthrough, 📦 {current_status.get('transferred', 0)} transferred)\n"
     text += f"  ⏳ Currently: {current_phase}\n"
     text += f"  📌 Remaining: {remaining}\n"
+    if disk_budget.reservations:
+        text += f"  💽 Disk: {format_bytes(disk_budget.reserved())} reserved • {format_bytes(max(disk_budget.available(), 0))} free\n"
     text += f"\n<b>📊 FILE COUNTS:</b>\n"
     text += f"  📥 Total Found: {total}\n"
     text += f"  ✓ To Process: {to_process}\n"
     text += f"  ⭐ Premium (>2GB): {premium_count}\n"
     text += f"  ✗ Skipped: {skipped}"
+    if current_status.get('duplicates'):
+        text += f" (♻️ {current_status['duplicates']} duplicates)"
+    
+    scanned = current_status.get('scanned', 0)
+    scan_total = current_status.get('scan_total', 0)
+    if scanned < scan_total:
+        text += f"\n  🔍 Scanned: {scanned}/{scan_total}"
     
     return text
 
-async def process_range(client: Client, start_link: str, end_link: str, status_message: Message):
-    """Main processor with dynamic captions and proper cancel handling"""
-    global current_status, dl_speed_data, ul_speed_data
+async def fetch_batch(client: Client, chat_id: int, msg_ids: List[int], retries: int = 3) -> list:
+    """Fetch one batch of message ids; raises once every attempt has failed"""
+    for attempt in range(retries):
+        try:
+            msgs = await client.get_messages(chat_id, msg_ids)
+            return msgs if isinstance(msgs, list) else [msgs]
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            print(f"⚠️ Scan error for ids {msg_ids[0]}-{msg_ids[-1]}: {e}")
+            await asyncio.sleep(1 + attempt)
+
+async def scan_range(client: Client, chat_id: int, start_id: int, end_id: int, out_queue: asyncio.Queue):
+    """Stream a message range into out_queue as batches, fetching concurrently but emitting in order"""
+    batch_size = Config.SCAN_BATCH_SIZE
+    concurrency = max(Config.SCAN_CONCURRENCY, 1)
+    
+    current_status['scanned'] = 0
+    current_status['scan_total'] = max(end_id - start_id + 1, 0)
+    
+    pending = deque()
+    
+    async def emit(task):
+        msg_ids, msgs = await task
+        # Empty batches still advance the job checkpoint; None marks a batch that could not be read
+        batch = None if msgs is None else [msg for msg in msgs if msg and not msg.empty and has_downloadable_media(msg)]
+        await out_queue.put((msg_ids, batch))
+        current_status['scanned'] += len(msg_ids)
+    
+    async def fetch(msg_ids):
+        try:
+            return msg_ids, await fetch_batch(client, chat_id, msg_ids)
+        except Exception as e:
+            print(f"❌ Ids {msg_ids[0]}-{msg_ids[-1]} could not be read: {e}")
+            return msg_ids, None
+    
+    try:
+        for first in range(start_id, end_id + 1, batch_size):
+            if current_status['cancel_all']:
+                break
+            msg_ids = list(range(first, min(first + batch_size, end_id + 1)))
+            pending.append(asyncio.create_task(fetch(msg_ids)))
+            if len(pending) >= concurrency:
+                await emit(pending.popleft())
+        
+        while pending and not current_status['cancel_all']:
+            await emit(pending.popleft())
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"❌ Scan stopped: {e}")
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    await out_queue.put(None)
+
+def get_media_file_id(message: Message):
+    """file_id of the message's media, reusable for cached sends"""
+    if not message:
+        return None
+    media = message.document or message.video or message.audio or message.photo
+    return media.file_id if media else None
+
+def get_file_unique_id(message: Message):
+    media = message.document or message.video or message.audio or message.photo
+    return media.file_unique_id if media else None
+
+class QueueItem:
+    """What the pipeline needs from one source message (the Message itself is not kept)"""
+    __slots__ = ('chat_id', 'msg_id', 'file_id', 'is_document', 'unique_id', 'file_size', 'name',
+                 'original_name', 'caption', 'premium', 'skip_reason', 'dest_msg_ids',
+                 'transfer', 'prefetch')
+    
+    def __init__(self, chat_id, msg_id, file_id, is_document, unique_id, file_size, name, original_name, caption, premium, skip_reason):
+        self.chat_id = chat_id
+        self.msg_id = msg_id
+        self.file_id = file_id
+        self.is_document = is_document  # Videos, audio and photos are re-sent as documents
+        self.unique_id = unique_id
+        self.file_size = file_size
+        self.name = name
+        self.original_name = original_name
+        self.caption = caption
+        self.premium = premium
+        self.skip_reason = skip_reason
+        self.dest_msg_ids = None
+        self.transfer = None  # Status entry, once a download or upload has started
+        self.prefetch = None  # Download task started ahead of the upload
+
+def build_queue_item(msg: Message, verdict=None) -> QueueItem:
+    """Filter and rename one message into a queue entry"""
+    file_name = get_file_name(msg)
+    should_process, reason = verdict or should_process_file(file_name)
+    
+    processed_name = rename_file(file_name)
+    
+    file_size = 0
+    if msg.document:
+        file_size = msg.document.file_size
+    elif msg.video:
+        file_size = msg.video.file_size
+    elif msg.audio:
+        file_size = msg.audio.file_size
+    
+    is_premium = file_size > SIZE_2GB
+    
+    skip_reason = None
+    
+    if not should_process:
+        skip_reason = reason
+    elif is_premium and not Config.PROCESS_ABOVE_2GB and not client_pool.has_premium():
+        skip_reason = "Premium"
+    
+    return QueueItem(
+        chat_id=msg.chat.id,
+        msg_id=msg.id,
+        file_id=get_media_file_id(msg),
+        is_document=msg.document is not None,
+        unique_id=get_file_unique_id(msg),
+        file_size=file_size,
+        name=processed_name,
+        original_name=file_name,
+        caption="" if skip_reason else (msg.caption or ""),
+        premium=is_premium,
+        skip_reason=skip_reason,
+    )
+
+async def fetch_source_message(client: Client, queue_item: QueueItem) -> Message:
+    """Re-fetch the source message right before a download (fresh file reference)"""
+    msgs = await fetch_batch(client, queue_item.chat_id, [queue_item.msg_id])
+    msg = msgs[0] if msgs else None
+    if not msg or msg.empty or not has_downloadable_media(msg):
+        raise ValueError(f"Source message {queue_item.msg_id} is no longer available")
+    return msg
+
+async def plan_stage(source_chat: int, in_queue: asyncio.Queue, out_queue: asyncio.Queue, job_state: dict):
+    """Turn scanned batches into queue entries and keep the counters current"""
+    try:
+        while True:
+            scanned = await in_queue.get()
+            if scanned is None or current_status['cancel_all']:
+                break
+            msg_ids, batch = scanned
+            
+            if batch is None:
+                # Lost batch: its ids stay unfinished so the checkpoint holds before them
+                job_state['failed'].update(msg_ids)
+                job_state['planned_up_to'] = msg_ids[-1]
+                current_status['unread'] += len(msg_ids)
+                continue
+            
+            # One ledger lookup per batch
+            done_ids = await get_processed_ids(source_chat, [msg.id for msg in batch]) if batch else set()
+            duplicate_ids = await find_duplicates([get_file_unique_id(msg) for msg in batch]) if batch else set()
+            
+            # Whitelist/blacklist for the whole batch in one scan
+            verdicts = classify_names([get_file_name(msg) for msg in batch])
+            
+            for msg, verdict in zip(batch, verdicts):
+                queue_item = build_queue_item(msg, verdict)
+                if msg.id in done_ids or msg.id in job_state['completed']:
+                    queue_item.skip_reason = "Done"
+                elif not queue_item.skip_reason and queue_item.unique_id in duplicate_ids:
+                    # Copies within this run are settled at transfer time (claim_media)
+                    queue_item.skip_reason = "Duplicate"
+                    current_status['duplicates'] += 1
+                
+                job_state['in_flight'].add(msg.id)
+                
+                current_status['total'] += 1
+                if queue_item.premium:
+                    current_status['premium_count'] += 1
+                if queue_item.skip_reason:
+                    current_status['skipped'] += 1
+                else:
+                    current_status['to_process'] += 1
+                
+                current_status['queue'].append(queue_item)
+                await out_queue.put(queue_item)
+            
+            job_state['planned_up_to'] = msg_ids[-1]
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"❌ Planning stopped: {e}")
+    
+    await out_queue.put(None)
+
+def build_caption(queue_item: QueueItem, file_size: int) -> str:
+    """Fill the caption template for one file"""
+    # Extract language and subtitle
+    language, subtitle = extract_language_and_subtitle(queue_item.original_name)
+    
+    # Build caption with variables
+    caption_template = Config.CUSTOM_CAPTION or "{filename} | {language} {subtitle}"
+    return caption_template.format(
+        filename=queue_item.name,
+        filesize=format_bytes(file_size),
+        language=language,
+        subtitle=subtitle,
+        filecaption=queue_item.caption
+    )
+
+def can_passthrough(queue_item: QueueItem) -> bool:
+    """True when re-uploading would produce the same file: a document with an unchanged name and no custom thumbnail"""
+    return (
+        queue_item.is_document
+        and queue_item.name == queue_item.original_name
+        and not has_any_thumbnail()
+        and queue_item.file_id is not None
+    )
+
+async def passthrough_file(client: Client, queue_item: QueueItem, destinations: list) -> list:
+    """Send the source media by reference. Returns the destinations that still need a transfer."""
+    file_id = queue_item.file_id
+    caption = build_caption(queue_item, queue_item.file_size)
+    
+    for i, dest_channel in enumerate(destinations):
+        if current_status['cancel_all']:
+            return []
+        try:
+            sent = await client.send_cached_media(dest_channel, file_id, caption=caption)
+            if sent:
+                queue_item.dest_msg_ids[dest_channel] = sent.id
+        except Exception as e:
+            if current_status['cancel_all']:
+                return []
+            print(f"⚠️ Passthrough to {dest_channel} failed, transferring instead: {e}")
+            return destinations[i:]
+    
+    return []
+
+async def send_to_destinations(client: Client, queue_item: QueueItem, destinations: list, caption: str, upload) -> list:
+    """Upload once with upload(dest), then fan out to the remaining destinations by file reference.
+    Returns the destinations that did not get the file."""
+    uploaded_file_id = None
+    failed = []
+    for dest_channel in destinations:
+        if current_status['cancel_all']:
+            break
+        
+        try:
+            if uploaded_file_id:
+                try:
+                    sent = await client.send_cached_media(dest_channel, uploaded_file_id, caption=caption)
+                    if sent:
+                        queue_item.dest_msg_ids[dest_channel] = sent.id
+                    continue
+                except Exception as e:
+                    if current_status['cancel_all']:
+                        break
+                    print(f"⚠️ Cached send to {dest_channel} failed, uploading instead: {e}")
+            
+            sent = await upload(dest_channel)
+            uploaded_file_id = get_media_file_id(sent)
+            if sent:
+                queue_item.dest_msg_ids[dest_channel] = sent.id
+            elif not current_status['cancel_all']:
+                failed.append(dest_channel)
+        except Exception as e:
+            if current_status['cancel_all']:
+                break
+            print(f"⚠️ Upload to {dest_channel} failed: {e}")
+            failed.append(dest_channel)
+    
+    return failed
+
+def check_delivered(failed: list):
+    """Raise when some destination did not get the file, so the item counts as failed"""
+    if failed and not current_status['cancel_all']:
+        raise ValueError(f"Not delivered to {', '.join(map(str, failed))}")
+
+async def relay_file(client: Client, queue_item: QueueItem, transfer: dict, destinations: list) -> bool:
+    """Stream one file from source to destinations through memory. Returns False if cancelled."""
+    file_size = queue_item.file_size
+    caption = build_caption(queue_item, file_size)
+    thumbnails = prepare_thumbnails(destinations)
+    progress = make_progress_callback(transfer)
+    
+    msg = await fetch_source_message(client, queue_item)
+    
+    async def upload(dest_channel):
+        set_transfer_phase(transfer, 'relaying', file_size)
+        return await relay_document(
+            client,
+            msg,
+            dest_channel,
+            queue_item.name,
+            file_size,
+            caption,
+            thumb=thumbnail_file(thumbnails.get(dest_channel)),
+            progress=progress,
+            is_cancelled=lambda: current_status['cancel_all']
+        )
+    
+    check_delivered(await send_to_destinations(client, queue_item, destinations, caption, upload))
+    return not current_status['cancel_all']
+
+def discard_staged(download_path: str):
+    """Delete a staged download and give its disk reservation back"""
+    try:
+        if os.path.exists(download_path):
+            os.remove(download_path)
+    except:
+        pass
+    disk_budget.release(download_path)
+
+async def stage_download(client: Client, queue_item: QueueItem, transfer: dict) -> str:
+    """Download into the staging directory once disk space is reserved.
+    Returns the path, or None if the file cannot fit (or the job was cancelled)."""
+    # Prefix with the message id so parallel workers never share a path
+    download_path = os.path.join(Config.DOWNLOAD_DIR, f"{queue_item.msg_id}_{queue_item.name}")
+    
+    # Wait for disk space
+    set_transfer_phase(transfer, 'waiting', queue_item.file_size)
+    if not await disk_budget.reserve(download_path, queue_item.file_size, current_status['cancel_event']):
+        return None
+    
+    done = False
+    try:
+        set_transfer_phase(transfer, 'downloading', queue_item.file_size)
+        msg = await fetch_source_message(client, queue_item)
+        await download_file(
+            client, msg, download_path, queue_item.file_size,
+            progress=make_progress_callback(transfer),
+            is_cancelled=lambda: current_status['cancel_all']
+        )
+        done = True
+        return download_path
+    finally:
+        # Failed or cancelled downloads leave nothing behind
+        if not done:
+            discard_staged(download_path)
+
+async def transfer_file(client: Client, queue_item: QueueItem, transfer: dict, destinations: list, staged_path: str = None) -> bool:
+    """Download one file (unless staged_path was prefetched) and upload it to the given destinations.
+    Returns False if cancelled."""
+    if Config.RELAY_MODE:
+        return await relay_file(client, queue_item, transfer, destinations)
+    
+    file_name = queue_item.name
+    progress = make_progress_callback(transfer)
+    
+    # DOWNLOAD
+    try:
+        download_path = staged_path or await stage_download(client, queue_item, transfer)
+    except Exception:
+        if current_status['cancel_all']:
+            return False
+        raise
+    
+    if current_status['cancel_all']:
+        if download_path:
+            discard_staged(download_path)
+        return False
+    
+    if not download_path:
+        # Files that could never fit are streamed through memory instead
+        print(f"💽 {file_name} does not fit on disk, relaying instead")
+        return await relay_file(client, queue_item, transfer, destinations)
+    
+    try:
+        # UPLOAD
+        actual_size = os.path.getsize(download_path) if os.path.exists(download_path) else 0
+        set_transfer_phase(transfer, 'uploading', actual_size)
+        
+        caption = build_caption(queue_item, actual_size)
+        
+        thumbnails = prepare_thumbnails(destinations)
+        
+        async def upload(dest_channel):
+            set_transfer_phase(transfer, 'uploading', actual_size)
+            return await send_big_document(
+                client,
+                dest_channel,
+                download_path,
+                file_name,
+                actual_size,
+                caption,
+                thumb=thumbnail_file(thumbnails.get(dest_channel)),
+                progress=progress,
+                is_cancelled=lambda: current_status['cancel_all']
+            )
+        
+        check_delivered(await send_to_destinations(client, queue_item, destinations, caption, upload))
+        return not current_status['cancel_all']
+    finally:
+        # Cleanup
+        discard_staged(download_path)
+
+def wants_prefetch(queue_item: QueueItem) -> bool:
+    """Only files that will be downloaded to disk anyway are fetched ahead"""
+    return (
+        Config.PREFETCH_MB > 0
+        and not Config.RELAY_MODE
+        and not queue_item.skip_reason
+        and not can_passthrough(queue_item)
+    )
+
+async def prefetch_file(queue_item: QueueItem) -> str:
+    async with client_pool.lease() as prefetch_client:
+        return await stage_download(prefetch_client, queue_item, queue_item.transfer)
+
+async def take_prefetch(queue_item: QueueItem, budget: PrefetchBudget) -> str:
+    """Wait for a prefetched download and hand its file over to the upload"""
+    task = queue_item.prefetch
+    queue_item.prefetch = None
+    try:
+        return await task
+    finally:
+        # Uploading now, so the next file may start downloading
+        budget.release(queue_item.file_size)
+
+def drop_prefetch(queue_item: QueueItem, budget: PrefetchBudget):
+    """Give back a prefetch's budget, cancelling or deleting whatever it left behind"""
+    task = queue_item.prefetch
+    if not task:
+        return
+    queue_item.prefetch = None
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled() and not task.exception() and task.result():
+        discard_staged(task.result())
+    budget.release(queue_item.file_size)
+
+async def prefetch_stage(in_queue: asyncio.Queue, out_queue: asyncio.Queue, budget: PrefetchBudget):
+    """Start downloading upcoming files while earlier ones are still uploading"""
+    try:
+        while True:
+            queue_item = await in_queue.get()
+            if queue_item is None or current_status['cancel_all']:
+                break
+            
+            if wants_prefetch(queue_item):
+                if not await budget.acquire(queue_item.file_size, current_status['cancel_event']):
+                    break
+                queue_item.transfer = new_transfer(queue_item, current_status['current_index'] + 1)
+                queue_item.prefetch = asyncio.create_task(prefetch_file(queue_item))
+            
+            try:
+                await out_queue.put(queue_item)
+            except asyncio.CancelledError:
+                drop_prefetch(queue_item, budget)
+                raise
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"❌ Prefetch stopped: {e}")
+    
+    await out_queue.put(None)
+
+def new_job_state(job_id, start_id: int, completed_ids=()) -> dict:
+    """Checkpoint tracking for a range job"""
+    return {
+        'id': job_id,
+        'in_flight': set(),              # Planned ids not yet finished
+        'completed': set(completed_ids), # Finished ids at or above the checkpoint
+        'failed': set(),                 # Ids that failed this run (kept behind the checkpoint)
+        'claims': {},                    # file_unique_id -> future, True once that media is mirrored
+        'planned_up_to': start_id - 1,   # Last id of the last planned batch
+    }
+
+def job_checkpoint(job_state: dict) -> int:
+    """Lowest message id that is not finished yet"""
+    unfinished = job_state['in_flight'] | job_state['failed']
+    if unfinished:
+        return min(unfinished)
+    return job_state['planned_up_to'] + 1
+
+def finish_item(job_state: dict, msg_id: int):
+    job_state['in_flight'].discard(msg_id)
+    job_state['completed'].add(msg_id)
+
+def fail_item(job_state: dict, msg_id: int):
+    """Leave a failed id unfinished so /resume tries it again"""
+    job_state['in_flight'].discard(msg_id)
+    job_state['failed'].add(msg_id)
+
+async def claim_media(job_state: dict, unique_id) -> bool:
+    """Make this copy the one that mirrors unique_id in this run.
+    Waits while an earlier copy is transferring; False once one has been mirrored."""
+    if not unique_id:
+        return True
+    claims = job_state['claims']
+    while unique_id in claims:
+        if await claims[unique_id]:
+            return False
+    claims[unique_id] = asyncio.get_running_loop().create_future()
+    return True
+
+def release_media(job_state: dict, unique_id, mirrored: bool):
+    """Settle a claim; after a failure the next copy gets its turn"""
+    claim = job_state['claims'].get(unique_id) if unique_id else None
+    if claim is None or claim.done():
+        return
+    claim.set_result(mirrored)
+    if not mirrored:
+        del job_state['claims'][unique_id]
+
+async def save_checkpoint(job_state: dict, status: str = None):
+    checkpoint_id = job_checkpoint(job_state)
+    job_state['completed'] = {i for i in job_state['completed'] if i >= checkpoint_id}
+    await save_job_checkpoint(job_state['id'], checkpoint_id, job_state['completed'], status)
+
+async def transfer_worker(client: Client, in_queue: asyncio.Queue, results: dict, job_state: dict, prefetch_budget: PrefetchBudget):
+    """Download and upload queue entries as they arrive"""
+    while True:
+        if not current_status['cancel_all'] and in_queue.empty() and not current_status['transfers']:
+            # Waiting on the scanner
+            current_status['status'] = 'fetching'
+        
+        queue_item = await in_queue.get()
+        if queue_item is None:
+            # Let the other workers see the end of the queue too
+            in_queue.put_nowait(None)
+            break
+        if current_status['cancel_all']:
+            drop_prefetch(queue_item, prefetch_budget)
+            break
+        
+        # Update queue display (show remaining files)
+        if current_status['queue']:
+            current_status['queue'].popleft()
+        
+        # Skip files that should not be processed
+        if queue_item.skip_reason:
+            finish_item(job_state, queue_item.msg_id)
+            continue
+        
+        # An earlier copy of the same media made it (only known once its transfer ended)
+        if not await claim_media(job_state, queue_item.unique_id):
+            current_status['transfers'].pop(queue_item.msg_id, None)
+            drop_prefetch(queue_item, prefetch_budget)
+            current_status['duplicates'] += 1
+            current_status['skipped'] += 1
+            current_status['to_process'] -= 1
+            finish_item(job_state, queue_item.msg_id)
+            continue
+        
+        # Increment file index when starting to process a file
+        current_status['current_index'] += 1
+        current_status['status'] = 'processing'
+        if queue_item.transfer:
+            # Already downloading since the previous upload
+            transfer = queue_item.transfer
+            transfer['index'] = current_status['current_index']
+        else:
+            transfer = new_transfer(queue_item, current_status['current_index'])
+        
+        mirrored = False
+        try:
+            destinations = list(Config.DESTINATION_CHANNEL_IDS)
+            queue_item.dest_msg_ids = {}
+            if can_passthrough(queue_item):
+                set_transfer_phase(transfer, 'passthrough', queue_item.file_size)
+                destinations = await passthrough_file(client, queue_item, destinations)
+                if current_status['cancel_all']:
+                    break
+            
+            transferred = bool(destinations)
+            if destinations:
+                staged_path = await take_prefetch(queue_item, prefetch_budget) if queue_item.prefetch else None
+                
+                # Spread transfers over the session pool (files over 2 GB need a premium session)
+                async with client_pool.lease(queue_item.premium) as transfer_client:
+                    if not await transfer_file(transfer_client, queue_item, transfer, destinations, staged_path):
+                        break
+            
+            # Done only once every destination has the file
+            missing = [dest for dest in Config.DESTINATION_CHANNEL_IDS if dest not in queue_item.dest_msg_ids]
+            if missing:
+                raise ValueError(f"Not delivered to {', '.join(map(str, missing))}")
+            
+            # Only increment after SUCCESSFUL processing
+            current_status['transferred' if transferred else 'passthrough'] += 1
+            results['completed'] += 1
+            current_status['processed'] = results['completed']
+            
+            await record_processed(
+                queue_item.chat_id,
+                queue_item.msg_id,
+                queue_item.unique_id,
+                queue_item.name,
+                [[dest, msg_id] for dest, msg_id in queue_item.dest_msg_ids.items()]
+            )
+            remember(queue_item.unique_id)
+            mirrored = True
+        except Exception as e:
+            print(f"❌ {queue_item.name} failed: {e}")
+            results['failed'] += 1
+            if current_status['cancel_all']:
+                break
+        finally:
+            current_status['transfers'].pop(queue_item.msg_id, None)
+            drop_prefetch(queue_item, prefetch_budget)
+            release_media(job_state, queue_item.unique_id, mirrored)
+        
+        if mirrored:
+            finish_item(job_state, queue_item.msg_id)
+        else:
+            fail_item(job_state, queue_item.msg_id)
+        await save_checkpoint(job_state)
+
+def transfer_worker_count() -> int:
+    return max(int(Config.PARALLEL_DOWNLOADS or 1), 1) * client_pool.size()
+
+async def transfer_stage(client: Client, in_queue: asyncio.Queue, job_state: dict, prefetch_budget: PrefetchBudget) -> dict:
+    """Run PARALLEL_DOWNLOADS transfer workers per pooled session over the queue"""
+    results = {'completed': 0, 'failed': 0}
     
+    await asyncio.gather(*(
+        transfer_worker(client, in_queue, results, job_state, prefetch_budget) for _ in range(transfer_worker_count())
+    ))
+    
+    return results
+
+async def process_range(client: Client, start_link: str, end_link: str, status_message: Message, job: dict = None):
+    """Main processor: scan -> plan -> transfer stages joined by bounded queues.
+    Pass a job record from get_unfinished_job() to resume it from its checkpoint."""
+    global current_status
+    
+    # One job at a time: a cancelled job keeps running until its workers wind down
+    if current_status['running']:
+        return None, "⚠️ A job is already running. Use /status to view it."
+    current_status['running'] = True
+    current_status['cancel_event'] = asyncio.Event()
     current_status['cancel_all'] = False
+    current_status['cancel_current_file'] = False
     current_status['status'] = 'fetching'
+    current_status['total'] = 0
+    current_status['processed'] = 0
+    current_status['current_index'] = 0
     current_status['skipped'] = 0
+    current_status['premium_count'] = 0
+    current_status['to_process'] = 0
+    current_status['queue'] = deque()
+    current_status['transfers'] = {}
+    current_status['passthrough'] = 0
+    current_status['transferred'] = 0
+    current_status['duplicates'] = 0
+    current_status['unread'] = 0
+    
+    publisher = None
     
     try:
         # Parse links
@@ -195,282 +913,80 @@ async def process_range(client: Client, start_link: str, end_link: str, status_m
         else:
             end_id = int(end_link.split('/')[-1])
         
-        # Fetch all messages
-        all_msgs = []
-        for msg_id in range(start_id, end_id + 1):
-            if current_status['cancel_all']:
-                break
-            try:
-                msg = await client.get_messages(source_channel, msg_id)
-                if msg and has_downloadable_media(msg):
-                    all_msgs.append((msg_id, msg))
-            except:
-                pass
-        
-        if not all_msgs:
-            return None, "❌ No files found in range"
-        
-        # Build queue with skip reasons
-        queue_list = []
-        skipped_count = 0
-        
-        for msg_id, msg in all_msgs:
-            file_name = get_file_name(msg)
-            should_process, reason = should_process_file(file_name)
-            
-            processed_name = rename_file(file_name)
-            
-            file_size = 0
-            if msg.document:
-                file_size = msg.document.file_size
-            elif msg.video:
-                file_size = msg.video.file_size
-            elif msg.audio:
-                file_size = msg.audio.file_size
-            
-            SIZE_2GB = 2 * 1024 * 1024 * 1024
-            is_premium = file_size > SIZE_2GB
-            
-            skip_reason = None
-            
-            if not should_process:
-                skip_reason = reason
-                skipped_count += 1
-            elif is_premium and not Config.PROCESS_ABOVE_2GB:
-                skip_reason = "Premium"
-                skipped_count += 1
-            
-            # Add all files to queue (both processable and skip-marked)
-            queue_list.append({
-                'msg_id': msg_id,
-                'msg': msg,
-                'name': processed_name,
-                'premium': is_premium,
-                'file_size': file_size,
-                'original_name': file_name,
-                'skip_reason': skip_reason,
-            })
-        
-        if not queue_list:
-            return None, "❌ No files found in range"
+        if job:
+            # Resume: everything below the checkpoint is already finished
+            start_id = job['checkpoint_id']
+            job_state = new_job_state(job['id'], start_id, job['completed_ids'])
+            await save_job_checkpoint(job['id'], start_id, job_state['completed'], 'running')
+        else:
+            job_id = await create_job(source_channel, start_link, end_link, start_id, end_id)
+            job_state = new_job_state(job_id, start_id)
         
-        # Count premium files
-        premium_count = sum(1 for item in queue_list if item.get('premium', False))
-        to_process_count = len(queue_list) - skipped_count
+        # Extra sessions join only if they can see the source and every destination
+        sessions = await client_pool.prepare([source_channel] + list(Config.DESTINATION_CHANNEL_IDS))
+        if sessions > 1:
+            print(f"🔀 Transfers spread over {sessions} sessions")
         
-        # Initialize
-        current_status['total'] = len(queue_list)
-        current_status['processed'] = 0
-        current_status['skipped'] = skipped_count
-        current_status['premium_count'] = premium_count
-        current_status['to_process'] = to_process_count
-        current_status['queue'] = queue_list[1:] if len(queue_list) > 1 else []
+        # Thumbnails (and any per-destination variants) are read from disk once per job
+        invalidate_thumbnails()
+        load_thumbnails()
         
-        processed_count = 0
-        failed_count = 0
+        # Status message updates (stops on its own once cancelled)
+        publisher = StatusPublisher(
+            status_message,
+            get_status_text,
+            reply_markup=get_cancel_button(),
+            until=lambda: current_status['cancel_all']
+        ).start()
         
-        # Update UI task
-        update_running = True
-        last_update_text = ""
+        # Pipeline: scanner -> planner -> transfer
+        scan_queue = asyncio.Queue(maxsize=SCAN_QUEUE_SIZE)
+        plan_queue = asyncio.Queue(maxsize=TRANSFER_QUEUE_SIZE)
+        transfer_queue = asyncio.Queue(maxsize=1)
         
-        async def update_ui():
-            nonlocal update_running, last_update_text
-            first_update = True
-            
-            while update_running:
-                try:
-                    new_text = get_status_text()
-                    
-                    if first_update or new_text != last_update_text:
-                        await status_message.edit_text(
-                            new_text,
-                            reply_markup=get_cancel_button(),
-                            parse_mode=ParseMode.HTML
-                        )
-                        last_update_text = new_text
-                        first_update = False
-                except:
-                    pass
-                
-                if not update_running or current_status['cancel_all']:
-                    break
-                
-                await asyncio.sleep(3)
+        # One download ahead per worker, within PREFETCH_MB
+        prefetch_budget = PrefetchBudget(Config.PREFETCH_MB * 1024 * 1024, transfer_worker_count())
         
-        update_task = asyncio.create_task(update_ui())
+        scan_task = asyncio.create_task(scan_range(client, source_channel, start_id, end_id, scan_queue))
+        plan_task = asyncio.create_task(plan_stage(source_channel, scan_queue, plan_queue, job_state))
+        prefetch_task = asyncio.create_task(prefetch_stage(plan_queue, transfer_queue, prefetch_budget))
         
-        # Process files
-        completed_count = 0
-        current_file_index = 0  # Track current file position
-        for idx, queue_item in enumerate(queue_list):
-            if current_status['cancel_all']:
-                break
-            
-            msg_id = queue_item['msg_id']
-            msg = queue_item['msg']
-            file_name = queue_item['name']
-            original_name = queue_item['original_name']
-            skip_reason = queue_item.get('skip_reason')
-            
-            # Update queue display (show remaining files)
-            current_status['queue'] = queue_list[idx+1:] if idx+1 < len(queue_list) else []
-            
-            # Skip files that should not be processed
-            if skip_reason:
-                continue
+        try:
+            results = await transfer_stage(client, transfer_queue, job_state, prefetch_budget)
+        finally:
+            # Producers may be blocked on a full queue after cancel
+            for task in (scan_task, plan_task, prefetch_task):
+                task.cancel()
+            await asyncio.gather(scan_task, plan_task, prefetch_task, return_exceptions=True)
             
-            # Increment file index when starting to process a file
-            current_file_index += 1
-            current_status['current_index'] = current_file_index
-            
-            download_path = os.path.join(Config.DOWNLOAD_DIR, file_name)
-            
-            try:
-                # DOWNLOAD
-                current_status['status'] = 'downloading'
-                current_status['file_name'] = file_name
-                current_status['current_size'] = 0
-                current_status['total_size'] = queue_item['file_size']
-                current_status['download_speed'] = 0
-                
-                dl_speed_data['last_time'] = time.time()
-                dl_speed_data['last_bytes'] = 0
-                
-                def download_progress(current, total):
-                    if current_status['cancel_all']:
-                        return
-                    global dl_speed_data
-                    current_status['current_size'] = current
-                    current_status['total_size'] = total
-                    
-                    now = time.time()
-                    elapsed = now - dl_speed_data['last_time']
-                    
-                    if elapsed > 0.5 and elapsed > 0:
-                        bytes_in_period = current - dl_speed_data['last_bytes']
-                        current_status['download_speed'] = bytes_in_period / elapsed
-                        dl_speed_data['last_bytes'] = current
-                        dl_speed_data['last_time'] = now
-                
-                try:
-                    await client.download_media(msg, file_name=download_path, progress=download_progress)
-                except Exception as e:
-                    if current_status['cancel_all']:
-                        try:
-                            os.remove(download_path)
-                        except:
-                            pass
-                        break
-                    raise
-                
-                if current_status['cancel_all']:
-                    try:
-                        os.remove(download_path)
-                    except:
-                        pass
-                    break
-                
-                # UPLOAD
-                current_status['status'] = 'uploading'
-                current_status['current_size'] = 0
-                current_status['upload_speed'] = 0
-                
-                actual_size = os.path.getsize(download_path) if os.path.exists(download_path) else 0
-                current_status['total_size'] = actual_size
-                
-                ul_speed_data['last_time'] = time.time()
-                ul_speed_data['last_bytes'] = 0
-                
-                # Extract language and subtitle
-                language, subtitle = extract_language_and_subtitle(original_name)
-                
-                # Build caption with variables
-                caption_template = Config.CUSTOM_CAPTION or "{filename} | {language} {subtitle}"
-                caption = caption_template.format(
-                    filename=file_name,
-                    filesize=format_bytes(actual_size),
-                    language=language,
-                    subtitle=subtitle,
-                    filecaption=msg.caption or ""
-                )
-                
-                thumbnail = get_thumbnail()
-                
-                def upload_progress(current, total):
-                    if current_status['cancel_all']:
-                        return
-                    global ul_speed_data
-                    current_status['current_size'] = current
-                    current_status['total_size'] = total if total > 0 else actual_size
-                    
-                    now = time.time()
-                    elapsed = now - ul_speed_data['last_time']
-                    
-                    if elapsed > 0.5 and elapsed > 0:
-                        bytes_in_period = current - ul_speed_data['last_bytes']
-                        current_status['upload_speed'] = bytes_in_period / elapsed
-                        ul_speed_data['last_bytes'] = current
-                        ul_speed_data['last_time'] = now
-                
-                # Upload to destinations
-                for dest_channel in Config.DESTINATION_CHANNEL_IDS:
-                    if current_status['cancel_all']:
-                        break
-                    
-                    try:
-                        current_status['current_size'] = 0
-                        ul_speed_data['last_time'] = time.time()
-                        ul_speed_data['last_bytes'] = 0
-                        
-                        await client.send_document(
-                            dest_channel,
-                            download_path,
-                            caption=caption,
-                            thumb=thumbnail,
-                            progress=upload_progress
-                        )
-                    except Exception as e:
-                        if current_status['cancel_all']:
-                            break
-                        continue
-                
-                if current_status['cancel_all']:
-                    try:
-                        os.remove(download_path)
-                    except:
-                        pass
-                    break
-                
-                # Cleanup
-                try:
-                    os.remove(download_path)
-                except:
-                    pass
-                
-                # Only increment after SUCCESSFUL processing
-                completed_count += 1
-                current_status['processed'] = completed_count
-                
-            except Exception as e:
-                print(f"Error: {e}")
-                failed_count += 1
-                try:
-                    if os.path.exists(download_path):
-                        os.remove(download_path)
-                except:
-                    pass
-                if current_status['cancel_all']:
-                    break
+            # Downloads started for files no worker picked up
+            while not transfer_queue.empty():
+                queue_item = transfer_queue.get_nowait()
+                if queue_item:
+                    drop_prefetch(queue_item, prefetch_budget)
         
-        # Stop update
-        update_running = False
+        # Cancelled or cut-short jobs stay resumable
+        await save_checkpoint(job_state, 'done' if job_checkpoint(job_state) > end_id else 'paused')
         
         current_status['status'] = 'idle'
-        current_status['queue'] = []
+        current_status['queue'].clear()
+        current_status['transfers'] = {}
         
-        summary = f"✅ <b>Complete!</b>\n\n📊 <b>Results:</b>\n✅ Processed: {completed_count}\n⏭️ Skipped: {current_status['skipped']}\n❌ Failed: {failed_count}"
-        return None, summary
+        if current_status['total'] == 0 and not current_status['unread'] and not current_status['cancel_all']:
+            return None, "❌ No files found in range"
         
+        summary = f"✅ <b>Complete!</b>\n\n📊 <b>Results:</b>\n✅ Processed: {results['completed']}\n🔗 Passthrough: {current_status['passthrough']}\n📦 Transferred: {current_status['transferred']}\n⏭️ Skipped: {current_status['skipped']}\n♻️ Duplicates avoided: {current_status['duplicates']}\n❌ Failed: {results['failed']}"
+        if current_status['unread']:
+            summary += f"\n⚠️ Unread: {current_status['unread']} message ids (use /resume to retry)"
+        return None, summary
+    
     except Exception as e:
         current_status['status'] = 'idle'
         return None, f"❌ Error: {str(e)[:100]}"
+    finally:
+        if publisher:
+            await publisher.stop()
+        current_status['running'] = False
+        current_status['cancel_event'] = None
+        current_status['cancel_all'] = False
+        current_status['cancel_current_file'] = False
@@ -0,0 +1,88 @@
+import time
+import asyncio
+from pyrogram.types import Message
+from pyrogram.enums import ParseMode
+from pyrogram.errors import FloodWait, MessageNotModified
+from bot.ratelimit import raise_flood_wait
+
+STATUS_MIN_INTERVAL = 3    # Seconds between edits when Telegram is happy
+STATUS_MAX_INTERVAL = 60   # Longest we back off to
+STATUS_BACKOFF = 2         # Interval multiplier after a FloodWait or slow edit
+STATUS_RECOVERY = 0.8      # Interval multiplier after a clean edit
+
+class StatusPublisher:
+    """Keeps one status message in sync with render(), at most one edit per tick"""
+    
+    def __init__(self, message: Message, render, reply_markup=None, until=None):
+        self.message = message
+        self.render = render
+        self.reply_markup = reply_markup
+        self.until = until  # Optional callable; publishing ends once it returns True
+        self.interval = STATUS_MIN_INTERVAL
+        self.last_text = None
+        self.stopped = asyncio.Event()
+        self.task = None
+    
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        return self
+    
+    async def stop(self):
+        """Stop publishing, abandoning an edit that is still waiting on Telegram"""
+        self.stopped.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+    
+    async def publish(self):
+        try:
+            text = self.render()
+        except Exception as e:
+            print(f"⚠️ Status render failed: {e}")
+            return
+        if text == self.last_text:
+            # Unchanged render: no request at all
+            self.interval = max(STATUS_MIN_INTERVAL, min(self.interval, STATUS_MAX_INTERVAL) * STATUS_RECOVERY)
+            return
+        
+        started = time.monotonic()
+        try:
+            await self.message.edit_text(text, reply_markup=self.reply_markup, parse_mode=ParseMode.HTML)
+            self.last_text = text
+        except MessageNotModified:
+            self.last_text = text
+        except FloodWait as e:
+            # Telegram pushed back: the next tick comes no sooner than it asked, then edits stay less frequent
+            print(f"⏳ Status updates flood-limited for {e.value}s")
+            self.interval = max(min(STATUS_MAX_INTERVAL, self.interval * STATUS_BACKOFF), e.value)
+            return
+        except Exception as e:
+            print(f"⚠️ Status update failed: {e}")
+            self.interval = min(STATUS_MAX_INTERVAL, self.interval * STATUS_BACKOFF)
+            return
+        
+        # Pyrogram sleeps through short FloodWaits itself, so a slow edit is pushback too
+        if time.monotonic() - started > self.interval:
+            self.interval = min(STATUS_MAX_INTERVAL, self.interval * STATUS_BACKOFF)
+        else:
+            self.interval = max(STATUS_MIN_INTERVAL, min(self.interval, STATUS_MAX_INTERVAL) * STATUS_RECOVERY)
+    
+    async def wait(self, seconds: float):
+        """Sleep until the next tick, waking early on stop()"""
+        try:
+            await asyncio.wait_for(self.stopped.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def run(self):
+        # FloodWaits on status edits come back here (backoff below) instead of being rescheduled
+        raise_flood_wait.set(True)
+        while not self.stopped.is_set():
+            if self.until and self.until():
+                break
+            await self.publish()
+            await self.wait(self.interval)
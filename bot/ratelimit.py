@@ -0,0 +1,101 @@
+import time
+import asyncio
+from contextvars import ContextVar
+from pyrogram.errors import FloodWait
+
+# Per-method budgets as (requests per second, burst), keyed by raw function name
+METHOD_LIMITS = {
+    "GetMessages": (10, 20),   # Range scans (up to 200 ids per call)
+    "EditMessage": (1, 3),     # Status updates and menus
+}
+
+# Methods that post into a chat and count against that chat's budget
+CHAT_WRITE_PREFIXES = ("Send", "Edit", "Forward")
+
+# Set inside tasks that handle FloodWait themselves (the status publisher); their calls are not rescheduled
+raise_flood_wait = ContextVar("raise_flood_wait", default=False)
+
+class TokenBucket:
+    """Reservation-style token bucket; callers wait out their own reservation"""
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+    
+    def reserve(self) -> float:
+        """Take one token and return how long to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+    
+    def block(self, seconds: float):
+        """Hold every caller for seconds (FloodWait) and drop any saved-up burst"""
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = now
+
+class RateLimiter:
+    """Global, per-method and per-chat budgets shared by every API call"""
+    
+    def __init__(self, per_second: float, chat_per_minute: float, max_flood_wait: int):
+        self.global_bucket = TokenBucket(per_second, max(per_second, 1))
+        self.chat_rate = chat_per_minute / 60
+        self.max_flood_wait = max_flood_wait
+        self.method_buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in METHOD_LIMITS.items()}  # Filled lazily
+        self.chat_buckets = {}
+    
+    def chat_bucket(self, query):
+        name = type(query).__name__
+        if not name.startswith(CHAT_WRITE_PREFIXES):
+            return None
+        peer = getattr(query, "peer", None) or getattr(query, "to_peer", None)
+        if peer is None:
+            return None
+        key = getattr(peer, "channel_id", None) or getattr(peer, "chat_id", None) or getattr(peer, "user_id", None)
+        if key is None:
+            return None
+        if key not in self.chat_buckets:
+            self.chat_buckets[key] = TokenBucket(self.chat_rate, max(self.chat_rate * 5, 1))
+        return self.chat_buckets[key]
+    
+    def buckets_for(self, query) -> list:
+        """Buckets a query draws from, most specific first"""
+        buckets = []
+        chat = self.chat_bucket(query)
+        if chat:
+            buckets.append(chat)
+        name = type(query).__name__
+        if name not in self.method_buckets:
+            # Unlisted methods only share the global budget, but still get their own FloodWait hold
+            self.method_buckets[name] = TokenBucket(self.global_bucket.rate, self.global_bucket.capacity)
+        buckets.append(self.method_buckets[name])
+        buckets.append(self.global_bucket)
+        return buckets
+    
+    async def acquire(self, buckets: list):
+        wait = max(bucket.reserve() for bucket in buckets)
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    async def call(self, query, send):
+        """Run send() within budget, rescheduling on FloodWait instead of failing"""
+        buckets = self.buckets_for(query)
+        while True:
+            await self.acquire(buckets)
+            try:
+                return await send()
+            except FloodWait as e:
+                if e.value > self.max_flood_wait:
+                    raise
+                # Everyone using the same chat (or method) waits, not just this call
+                buckets[0].block(e.value)
+                if raise_flood_wait.get():
+                    raise
+                print(f"⏳ FloodWait {e.value}s on {type(query).__name__}, rescheduling")
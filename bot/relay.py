@@ -0,0 +1,40 @@
+import io
+import math
+from pyrogram.client import Client
+from pyrogram import raw
+from pyrogram.types import Message
+from bot.uploader import UPLOAD_PART_SIZE, BIG_FILE_SIZE, upload_parts, send_uploaded_document
+
+async def stream_parts(client: Client, message: Message):
+    """Upload-sized parts of the source stream, with their part numbers"""
+    pending = b""
+    index = 0
+    async for chunk in client.stream_media(message):
+        pending += chunk
+        while len(pending) >= UPLOAD_PART_SIZE:
+            yield index, pending[:UPLOAD_PART_SIZE]
+            pending = pending[UPLOAD_PART_SIZE:]
+            index += 1
+    if pending:
+        yield index, pending
+
+async def relay_document(client: Client, message: Message, chat_id, file_name: str, file_size: int,
+                         caption: str, thumb=None, progress=None, is_cancelled=None) -> Message:
+    """Stream a message's media straight into a new document upload without touching disk"""
+    if file_size <= BIG_FILE_SIZE:
+        # Small files fit in memory and take the normal upload path
+        data = io.BytesIO()
+        async for chunk in client.stream_media(message):
+            data.write(chunk)
+        data.name = file_name
+        return await client.send_document(chat_id, data, file_name=file_name, caption=caption, thumb=thumb, progress=progress)
+
+    # Parts go up concurrently while the source stream keeps downloading
+    file_id = client.rnd_id()
+    total_parts = math.ceil(file_size / UPLOAD_PART_SIZE)
+    await upload_parts(client, stream_parts(client, message), file_id, total_parts, file_size, progress, is_cancelled)
+    if is_cancelled and is_cancelled():
+        return None
+    
+    input_file = raw.types.InputFileBig(id=file_id, parts=total_parts, name=file_name)
+    return await send_uploaded_document(client, chat_id, input_file, file_name, caption, thumb)
@@ -0,0 +1,106 @@
+import os
+import shutil
+import asyncio
+from bot.config import Config
+
+DISK_RECHECK_SECONDS = 5
+
+async def wait_for_change(changed: asyncio.Event, cancelled: asyncio.Event = None, timeout: float = None):
+    """Block until a budget is released or the job is cancelled (or timeout seconds pass)"""
+    changed.clear()
+    waiters = [asyncio.create_task(changed.wait())]
+    if cancelled is not None:
+        waiters.append(asyncio.create_task(cancelled.wait()))
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+class DiskBudget:
+    """Admission control for files staged in the download directory"""
+    
+    def __init__(self, path: str, margin: int):
+        self.path = path
+        self.margin = margin  # Bytes always left free on the volume
+        self.reservations = {}  # Staging path -> reserved bytes
+        self.changed = asyncio.Event()
+    
+    def disk_free(self) -> int:
+        os.makedirs(self.path, exist_ok=True)
+        return shutil.disk_usage(self.path).free
+    
+    def staged(self) -> int:
+        """Bytes already written by admitted files (they count against their own reservation)"""
+        total = 0
+        for path in self.reservations:
+            # Pyrogram writes to "<path>.temp" and renames when the download completes
+            for staged_path in (path, path + ".temp"):
+                try:
+                    total += os.path.getsize(staged_path)
+                except OSError:
+                    pass
+        return total
+    
+    def reserved(self) -> int:
+        return sum(self.reservations.values())
+    
+    def available(self) -> int:
+        """Bytes a new file could still be given"""
+        return self.disk_free() + self.staged() - self.reserved() - self.margin
+    
+    def fits_ever(self, size: int) -> bool:
+        """Could this file fit once every current reservation is released?"""
+        return size <= self.disk_free() + self.staged() - self.margin
+    
+    async def reserve(self, path: str, size: int, cancelled: asyncio.Event = None) -> bool:
+        """Wait until size bytes are free and claim them for path.
+        Returns False when the file can never fit (or the job is cancelled)."""
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                return False
+            if size <= self.available():
+                self.reservations[path] = size
+                return True
+            if not self.fits_ever(size):
+                return False
+            
+            # Held back until another staged file is released (free space can also
+            # change outside the bot, so it is re-read every few seconds)
+            await wait_for_change(self.changed, cancelled, timeout=DISK_RECHECK_SECONDS)
+    
+    def release(self, path: str):
+        if self.reservations.pop(path, None) is not None:
+            self.changed.set()
+
+disk_budget = DiskBudget(Config.DOWNLOAD_DIR, Config.DISK_MARGIN_MB * 1024 * 1024)
+
+class PrefetchBudget:
+    """Bounds downloads started ahead of their upload, by bytes and by file count"""
+    
+    def __init__(self, max_bytes: int, max_files: int):
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.used_bytes = 0
+        self.files = 0
+        self.changed = asyncio.Event()
+    
+    def fits(self, size: int) -> bool:
+        if self.files >= self.max_files:
+            return False
+        # One file is always allowed so a single large file still double-buffers
+        return self.files == 0 or self.used_bytes + size <= self.max_bytes
+    
+    async def acquire(self, size: int, cancelled: asyncio.Event = None) -> bool:
+        while not self.fits(size):
+            if cancelled is not None and cancelled.is_set():
+                return False
+            await wait_for_change(self.changed, cancelled)
+        self.used_bytes += size
+        self.files += 1
+        return True
+    
+    def release(self, size: int):
+        self.used_bytes -= size
+        self.files -= 1
+        self.changed.set()
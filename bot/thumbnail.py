@@ -1,37 +1,121 @@
+import io
 import os
-from PIL import Image
 from bot.config import Config
 
 THUMBNAIL_PATH = os.path.join(Config.THUMBNAIL_DIR, "default_thumb.jpg")
+THUMBNAIL_NAME = "thumb.jpg"
 
-def save_thumbnail(photo_path: str) -> bool:
+# Processed JPEG bytes, loaded once: None -> default thumbnail, chat id -> per-destination variant
+thumbnail_cache = {}
+thumbnails_loaded = False
+
+def variant_path(chat_id) -> str:
+    """Where a destination's own thumbnail lives (e.g. thumbnails/-1001234567890.jpg)"""
+    return os.path.join(Config.THUMBNAIL_DIR, f"{chat_id}.jpg")
+
+def read_thumbnail(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+def load_thumbnails():
+    """Read the default thumbnail and every variant into memory, once"""
+    global thumbnails_loaded
+    if thumbnails_loaded:
+        return
+    thumbnail_cache.clear()
+    
+    data = read_thumbnail(THUMBNAIL_PATH)
+    if data:
+        thumbnail_cache[None] = data
+    
+    try:
+        names = os.listdir(Config.THUMBNAIL_DIR)
+    except OSError:
+        names = []
+    for name in names:
+        chat_id, ext = os.path.splitext(name)
+        if ext != ".jpg" or not chat_id.lstrip("-").isdigit():
+            continue
+        data = read_thumbnail(os.path.join(Config.THUMBNAIL_DIR, name))
+        if data:
+            thumbnail_cache[int(chat_id)] = data
+    
+    thumbnails_loaded = True
+    if thumbnail_cache:
+        print(f"🖼️ Thumbnails loaded: {len(thumbnail_cache)}")
+
+def invalidate_thumbnails():
+    """Forget the cache; the next lookup reads the thumbnail directory again"""
+    global thumbnails_loaded
+    thumbnails_loaded = False
+    thumbnail_cache.clear()
+
+def prepare_thumbnails(destinations: list) -> dict:
+    """Resolve the thumbnail bytes for each destination before a job starts"""
+    load_thumbnails()
+    default = thumbnail_cache.get(None)
+    return {dest: thumbnail_cache.get(dest, default) for dest in destinations}
+
+def save_thumbnail(photo_path: str, chat_id=None) -> bool:
     try:
+        # Pillow is only needed when a thumbnail is set
+        from PIL import Image
+        
         os.makedirs(Config.THUMBNAIL_DIR, exist_ok=True)
         
         with Image.open(photo_path) as img:
             img = img.convert("RGB")
             img.thumbnail((320, 320))
-            img.save(THUMBNAIL_PATH, "JPEG", quality=85)
+            buffer = io.BytesIO()
+            img.save(buffer, "JPEG", quality=85)
         
+        data = buffer.getvalue()
+        with open(THUMBNAIL_PATH if chat_id is None else variant_path(chat_id), "wb") as f:
+            f.write(data)
+        
+        load_thumbnails()
+        thumbnail_cache[chat_id] = data
         return True
     except Exception as e:
         print(f"Error saving thumbnail: {e}")
         return False
 
-def get_thumbnail() -> str | None:
-    if os.path.exists(THUMBNAIL_PATH):
-        return THUMBNAIL_PATH
-    return None
+def get_thumbnail_bytes(chat_id=None) -> bytes | None:
+    """Thumbnail for a destination (falling back to the default), from memory"""
+    load_thumbnails()
+    if chat_id is not None and chat_id in thumbnail_cache:
+        return thumbnail_cache[chat_id]
+    return thumbnail_cache.get(None)
+
+def thumbnail_file(data: bytes | None) -> io.BytesIO | None:
+    """A file object for one upload; Pyrogram seeks it, so uploads never share one"""
+    if not data:
+        return None
+    thumb = io.BytesIO(data)
+    thumb.name = THUMBNAIL_NAME
+    return thumb
 
-def delete_thumbnail() -> bool:
+def delete_thumbnail(chat_id=None) -> bool:
+    path = THUMBNAIL_PATH if chat_id is None else variant_path(chat_id)
     try:
-        if os.path.exists(THUMBNAIL_PATH):
-            os.remove(THUMBNAIL_PATH)
+        if os.path.exists(path):
+            os.remove(path)
+            thumbnail_cache.pop(chat_id, None)
             return True
         return False
     except Exception as e:
         print(f"Error deleting thumbnail: {e}")
+        invalidate_thumbnails()
         return False
 
 def has_thumbnail() -> bool:
-    return os.path.exists(THUMBNAIL_PATH)
+    load_thumbnails()
+    return None in thumbnail_cache
+
+def has_any_thumbnail() -> bool:
+    """True when some destination would get a custom thumbnail"""
+    load_thumbnails()
+    return bool(thumbnail_cache)
@@ -0,0 +1,157 @@
+import math
+import asyncio
+from pyrogram.client import Client
+from pyrogram import raw, types, utils
+from pyrogram.session import Session
+from pyrogram.types import Message
+from bot.config import Config
+
+UPLOAD_PART_SIZE = 512 * 1024  # Telegram upload part size (stream chunks are 1 MiB)
+BIG_FILE_SIZE = 10 * 1024 * 1024  # Files above this must use SaveBigFilePart
+PART_RETRIES = 3
+PART_SLEEP_THRESHOLD = 60  # FloodWaits up to this long are slept through per part
+
+async def read_parts(path: str):
+    """Upload-sized parts of a file on disk, with their part numbers"""
+    with open(path, "rb") as f:
+        index = 0
+        while True:
+            data = f.read(UPLOAD_PART_SIZE)
+            if not data:
+                break
+            yield index, data
+            index += 1
+
+async def open_media_sessions(client: Client, count: int) -> list:
+    """Started media sessions on the client's own DC (where uploads go)"""
+    sessions = []
+    try:
+        for _ in range(count):
+            session = Session(
+                client, await client.storage.dc_id(), await client.storage.auth_key(),
+                await client.storage.test_mode(), is_media=True
+            )
+            await session.start()
+            sessions.append(session)
+    except Exception:
+        for session in sessions:
+            await session.stop()
+        raise
+    return sessions
+
+async def upload_parts(client: Client, parts, file_id: int, total_parts: int, total_size: int,
+                       progress=None, is_cancelled=None):
+    """Send SaveBigFilePart calls concurrently over several media sessions.
+    parts yields (part number, bytes); each part is retried on its own."""
+    in_flight = max(Config.UPLOAD_PARALLEL_PARTS, 1)
+    sessions = await open_media_sessions(client, max(min(Config.UPLOAD_SESSIONS, in_flight), 1))
+    queue = asyncio.Queue(maxsize=in_flight)
+    errors = []
+    sent_bytes = 0
+    
+    async def send_part(session: Session, index: int, data: bytes):
+        for attempt in range(PART_RETRIES + 1):
+            try:
+                await session.invoke(
+                    raw.functions.upload.SaveBigFilePart(
+                        file_id=file_id,
+                        file_part=index,
+                        file_total_parts=total_parts,
+                        bytes=data
+                    ),
+                    sleep_threshold=PART_SLEEP_THRESHOLD
+                )
+                return
+            except Exception as e:
+                if attempt == PART_RETRIES:
+                    raise
+                print(f"⚠️ Upload part {index} failed ({e}), retrying")
+                await asyncio.sleep(1 + attempt)
+    
+    async def worker(session: Session):
+        nonlocal sent_bytes
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if errors:
+                # Keep draining so the producer never blocks
+                continue
+            index, data = item
+            try:
+                await send_part(session, index, data)
+            except Exception as e:
+                errors.append(e)
+                continue
+            sent_bytes += len(data)
+            if progress:
+                progress(min(sent_bytes, total_size), total_size)
+    
+    workers = [asyncio.create_task(worker(sessions[i % len(sessions)])) for i in range(in_flight)]
+    
+    try:
+        count = 0
+        async for index, data in parts:
+            if errors or (is_cancelled and is_cancelled()):
+                break
+            await queue.put((index, data))
+            count += 1
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for session in sessions:
+            await session.stop()
+    
+    if errors:
+        raise errors[0]
+    if count != total_parts and not (is_cancelled and is_cancelled()):
+        raise ValueError(f"Uploaded {count} of {total_parts} parts")
+
+async def upload_big_file(client: Client, path: str, file_name: str, file_size: int, progress=None, is_cancelled=None):
+    """Upload a staged file with parallel parts; returns the InputFileBig to send"""
+    file_id = client.rnd_id()
+    total_parts = math.ceil(file_size / UPLOAD_PART_SIZE)
+    await upload_parts(client, read_parts(path), file_id, total_parts, file_size, progress, is_cancelled)
+    return raw.types.InputFileBig(id=file_id, parts=total_parts, name=file_name)
+
+async def send_uploaded_document(client: Client, chat_id, input_file, file_name: str, caption: str, thumb=None) -> Message:
+    """Send an already uploaded InputFile as a document, like send_document does"""
+    media = raw.types.InputMediaUploadedDocument(
+        mime_type=client.guess_mime_type(file_name) or "application/zip",
+        file=input_file,
+        thumb=await client.save_file(thumb) if thumb else None,
+        attributes=[raw.types.DocumentAttributeFilename(file_name=file_name)]
+    )
+    
+    r = await client.invoke(
+        raw.functions.messages.SendMedia(
+            peer=await client.resolve_peer(chat_id),
+            media=media,
+            random_id=client.rnd_id(),
+            **await utils.parse_text_entities(client, caption, None, None)
+        )
+    )
+    
+    for update in r.updates:
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            return await types.Message._parse(
+                client, update.message,
+                {u.id: u for u in r.users},
+                {c.id: c for c in r.chats}
+            )
+    return None
+
+async def send_big_document(client: Client, chat_id, path: str, file_name: str, file_size: int, caption: str,
+                            thumb=None, progress=None, is_cancelled=None) -> Message:
+    """send_document for staged files, with big files uploaded part-parallel"""
+    if file_size <= BIG_FILE_SIZE:
+        return await client.send_document(chat_id, path, file_name=file_name, caption=caption, thumb=thumb, progress=progress)
+    
+    input_file = await upload_big_file(client, path, file_name, file_size, progress, is_cancelled)
+    if is_cancelled and is_cancelled():
+        return None
+    return await send_uploaded_document(client, chat_id, input_file, file_name, caption, thumb)
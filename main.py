@@ -1,28 +1,71 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import sys
+import asyncio
+from pyrogram import idle
 from bot.config import Config
-from bot.client import app
-from bot.handlers import register_handlers
-from bot.database import load_settings_sync
+from bot.client import app, client_pool
+from bot.handlers import register_handlers, resume_unfinished_job, settings_ready
+from bot.database import init_storage, flush_settings
+
+def apply_settings(settings):
+    """Copy loaded settings onto Config"""
+    Config.SOURCE_CHANNEL_IDS = settings.get("source_channels", [])
+    Config.DESTINATION_CHANNEL_IDS = settings.get("destination_channels", [])
+    Config.WHITELIST_WORDS = settings.get("whitelist_words", [])
+    Config.BLACKLIST_WORDS = settings.get("blacklist_words", [])
+    Config.REMOVED_WORDS = settings.get("removed_words", [])
+    Config.FILE_PREFIX = settings.get("file_prefix", "")
+    Config.FILE_SUFFIX = settings.get("file_suffix", "")
+    Config.REMOVE_USERNAME = settings.get("remove_username", False)
+    Config.CUSTOM_CAPTION = settings.get("custom_caption", "")
+    Config.START_LINK = settings.get("start_link")
+    Config.END_LINK = settings.get("end_link")
+    Config.PROCESS_ABOVE_2GB = settings.get("process_above_2gb", False)
+    Config.PARALLEL_DOWNLOADS = settings.get("parallel_downloads", 1)
 
-def load_settings_from_database():
-    """Load all settings from database (MongoDB or memory)"""
+async def load_settings_from_database():
+    """Create tables and load all settings from database (PostgreSQL or memory)"""
     try:
-        settings = load_settings_sync()
-        Config.SOURCE_CHANNEL_IDS = settings.get("source_channels", [])
-        Config.DESTINATION_CHANNEL_IDS = settings.get("destination_channels", [])
-        Config.WHITELIST_WORDS = settings.get("whitelist_words", [])
-        Config.BLACKLIST_WORDS = settings.get("blacklist_words", [])
-        Config.REMOVED_WORDS = settings.get("removed_words", [])
-        Config.FILE_PREFIX = settings.get("file_prefix", "")
-        Config.FILE_SUFFIX = settings.get("file_suffix", "")
-        Config.REMOVE_USERNAME = settings.get("remove_username", False)
-        Config.CUSTOM_CAPTION = settings.get("custom_caption", "")
-        Config.START_LINK = settings.get("start_link")
-        Config.END_LINK = settings.get("end_link")
-        Config.PROCESS_ABOVE_2GB = settings.get("process_above_2gb", False)
-        Config.PARALLEL_DOWNLOADS = settings.get("parallel_downloads", 1)
+        apply_settings(await init_storage())
     except Exception as e:
         print(f"⚠️ Could not load settings: {e}")
+    finally:
+        # Updates that arrived while connecting are handled from here on
+        settings_ready.set()
+
+def print_config_status():
+    info = Config.get_info()
+    print(f"\nConfiguration status:")
+    print(f"  - API: {'✅ OK' if info['api_configured'] else '❌ Missing'}")
+    print(f"  - Bot Token: {'✅ OK' if info['bot_token_set'] else '❌ Missing'}")
+    print(f"  - Source Channels: {info['source_channels']} configured")
+    print(f"  - Destination Channels: {info['destination_channels']} configured")
+    print(f"  - Whitelist: {len(info['whitelist_words'])} words")
+    print(f"  - Blacklist: {len(info['blacklist_words'])} words")
+    print()
+
+async def run_bot():
+    # Database setup and Telegram connect run side by side (handlers wait for the settings)
+    connect_started = time.perf_counter()
+    await asyncio.gather(app.start(), client_pool.start(), load_settings_from_database())
+    connected = time.perf_counter()
+    
+    print_config_status()
+    print(f"⏱️ Ready in {connected - STARTUP_STARTED:.2f}s "
+          f"(imports {connect_started - STARTUP_STARTED:.2f}s, connect + settings {connected - connect_started:.2f}s)")
+    print("=" * 50)
+    
+    # Pick up a job interrupted by a crash or container restart
+    await resume_unfinished_job(app)
+    
+    await idle()
+    
+    # Write any settings still waiting in the write-behind buffer
+    await flush_settings()
+    await client_pool.stop()
+    await app.stop()
 
 def main():
     print("=" * 50)
@@ -40,25 +83,11 @@ def main():
         print("=" * 50)
         sys.exit(1)
     
-    # Load settings from database
-    load_settings_from_database()
-    
-    info = Config.get_info()
-    print(f"\nConfiguration status:")
-    print(f"  - API: {'✅ OK' if info['api_configured'] else '❌ Missing'}")
-    print(f"  - Bot Token: {'✅ OK' if info['bot_token_set'] else '❌ Missing'}")
-    print(f"  - Source Channels: {info['source_channels']} configured")
-    print(f"  - Destination Channels: {info['destination_channels']} configured")
-    print(f"  - Whitelist: {len(info['whitelist_words'])} words")
-    print(f"  - Blacklist: {len(info['blacklist_words'])} words")
-    print()
-    
     register_handlers(app)
     
     print("Starting bot...")
-    print("=" * 50)
     
-    app.run()
+    app.run(run_bot())
 
 if __name__ == "__main__":
     main()